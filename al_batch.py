@@ -0,0 +1,622 @@
+import numpy as np
+from al_entities import Entity, Geyser
+from al_cell import Cell
+from al_grid import Grid, EMPTY, ROCK, GEYSER, ENERGY, CELL, NO_ID
+
+
+GENOME_LENGTH = 109
+PROGRAM_LENGTH = 101
+
+# genome commands, see al_cell.commands
+MOVE = 0
+CLOCKWISE = 1
+CCLOCKWISE = 2
+SET_NEW_START = 3
+CHECK_OBSTACLE = 4
+CHECK_FOOD = 5
+CHECK_CELL = 6
+CHECK_EMPTY = 7
+CHECK_RELATIVE = 8
+EAT_ENERGY = 9
+EAT_CELL = 10
+PHOTOSYNTHESIS = 11
+CHECK_COUNTER = 12
+SET_COUNTER = 13
+GO_TO = 14
+LAST_COMMAND = GO_TO
+
+NO_ACTION = -1
+
+
+class BatchEngine():
+    # Lockstep, array based stepping of a whole world.
+    #
+    # Every live cell keeps its state in one row of the per-cell arrays and
+    # all cells walk their genomes together, one instruction per step.
+    # Sensing commands read the grid as it is after births and deaths of the
+    # current tick; the terminal commands (move, eat, photosynthesis) are
+    # collected and applied together once every cell has finished.
+    # Conflicts are resolved with a random per-tick priority:
+    #   - a cell eats at most one neighbour and is eaten by at most one cell,
+    #     a cell that is itself the target of an eat_cell can not eat;
+    #   - an energy drop feeds at most one cell per tick;
+    #   - eaten cells lose their pending action;
+    #   - moves go to cells still empty after eating, one mover per target;
+    #   - one newborn per empty target.
+    def __init__(
+            self,
+            world,
+            seed: int | None = None,
+            grid: Grid | None = None,
+            energy_at=None,
+            load: bool = True
+    ):
+        self.world = world
+        if seed is None and hasattr(world, "rng"):
+            seed = world.rng.spawn(1)[0]
+        self.rng = np.random.default_rng(seed)
+        self.grid = Grid(world.size, Entity.directions) if grid is None \
+            else grid
+        self.offsets = np.array(self.grid.offsets, dtype=np.int64)
+        self.energy_at = np.zeros(len(self.grid.ids), dtype=np.int64) \
+            if energy_at is None else energy_at
+        # flat index range of the grid this engine steps, the cells outside
+        # of it are only seen as neighbours
+        self.region = (0, len(self.grid.ids))
+        self.geysers = np.zeros(0, dtype=np.int64)
+        self.geyser_prod = np.zeros(0, dtype=np.int64)
+
+        self.size = 0
+        self.capacity = 0
+        self.allocate(1024)
+
+        self.total_life_cells = 0
+        self.total_nolife_objects = 0
+        self.ticks = 0
+
+        if load:
+            self.load()
+
+    def allocate(self, capacity: int):
+        def grow(array, shape=()):
+            new_array = np.zeros((capacity,) + shape, dtype=array.dtype) \
+                if array is not None else None
+            if array is not None:
+                new_array[:self.size] = array[:self.size]
+            return new_array
+
+        if self.capacity == 0:
+            self.genome = np.zeros((capacity, GENOME_LENGTH), dtype=np.uint8)
+            self.color = np.zeros((capacity, 3), dtype=np.int16)
+            for name in (
+                "index", "energy", "ttl", "orientation", "start", "counter",
+                "criteria", "max_energy", "min_energy", "min_division", "eid"
+            ):
+                setattr(self, name, np.zeros(capacity, dtype=np.int64))
+            self.alive = np.zeros(capacity, dtype=bool)
+        else:
+            self.genome = grow(self.genome, (GENOME_LENGTH,))
+            self.color = grow(self.color, (3,))
+            for name in (
+                "index", "energy", "ttl", "orientation", "start", "counter",
+                "criteria", "max_energy", "min_energy", "min_division", "eid",
+                "alive"
+            ):
+                setattr(self, name, grow(getattr(self, name)))
+        self.capacity = capacity
+
+    def add_cells(
+            self,
+            index,
+            genome,
+            color,
+            orientation,
+            energy=None,
+            start=None,
+            eid=None
+    ):
+        count = len(index)
+        if self.size + count > self.capacity:
+            capacity = self.capacity
+            while self.size + count > capacity:
+                capacity *= 2
+            self.allocate(capacity)
+        slots = np.arange(self.size, self.size + count)
+        self.size += count
+
+        genome = np.asarray(genome, dtype=np.uint8).reshape(
+            count, GENOME_LENGTH
+        )
+        self.genome[slots] = genome
+        self.color[slots] = color
+        self.index[slots] = index
+        self.orientation[slots] = orientation
+        self.max_energy[slots] = genome[:, 103].astype(np.int64) * 10
+        self.min_energy[slots] = 10 + genome[:, 104].astype(np.int64)
+        self.min_division[slots] = 500 + genome[:, 106].astype(np.int64)
+        self.ttl[slots] = genome[:, 102].astype(np.int64) * 10
+        self.energy[slots] = self.max_energy[slots] if energy is None \
+            else energy
+        if start is None:
+            self.start[slots] = genome[:, 101]
+        else:
+            start = np.asarray(start, dtype=np.int64)
+            self.start[slots] = np.where(start > 0, start, genome[:, 101])
+        self.counter[slots] = 0
+        self.criteria[slots] = 100
+        self.eid[slots] = NO_ID if eid is None else eid
+        self.alive[slots] = True
+
+        self.grid.ids[index] = slots
+        self.grid.types[index] = CELL
+        return slots
+
+    def kill(self, slots, leave_energy: bool = True):
+        self.alive[slots] = False
+        index = self.index[slots]
+        energy = self.energy[slots]
+        self.grid.ids[index] = NO_ID
+        if leave_energy:
+            drop = energy > 0
+            self.grid.types[index] = np.where(drop, ENERGY, EMPTY)
+            self.energy_at[index] = np.where(drop, energy, 0)
+        else:
+            self.grid.types[index] = EMPTY
+
+    def compact(self):
+        slots = np.nonzero(self.alive[:self.size])[0]
+        if len(slots) == self.size:
+            return
+        count = len(slots)
+        self.genome[:count] = self.genome[slots]
+        self.color[:count] = self.color[slots]
+        for name in (
+            "index", "energy", "ttl", "orientation", "start", "counter",
+            "criteria", "max_energy", "min_energy", "min_division", "eid",
+            "alive"
+        ):
+            array = getattr(self, name)
+            array[:count] = array[slots]
+        self.alive[count:self.size] = False
+        self.size = count
+        self.grid.ids[self.index[:count]] = np.arange(count)
+
+    def load(self):
+        # copy the object world into arrays
+        world = self.world
+        world.purge()
+        geysers = []
+        self.grid.inner(self.grid.types)[world.terrain()] = ROCK
+        if world.field is not None:
+            drops = world.field.indices()
+            self.grid.types[drops] = ENERGY
+            self.energy_at[drops] = world.field.values[drops]
+        for drop in world.by_name["Energy"].values():
+            index = self.grid.index(drop.coord)
+            self.grid.place(index, NO_ID, ENERGY)
+            self.energy_at[index] = drop.energy
+        for geyser in world.by_name["Geyser"].values():
+            index = self.grid.index(geyser.coord)
+            self.grid.place(index, NO_ID, GEYSER)
+            self.energy_at[index] = geyser.energy
+            geysers.append((index, geyser.prod_energy))
+        cells = list(world.by_name["Cell"].values())
+
+        if geysers:
+            self.geysers, self.geyser_prod = (
+                np.array(column, dtype=np.int64) for column in zip(*geysers)
+            )
+
+        if cells:
+            slots = self.add_cells(
+                np.array([self.grid.index(cell.coord) for cell in cells]),
+                np.frombuffer(
+                    b"".join(cell.genome for cell in cells), dtype=np.uint8
+                ),
+                [cell.color for cell in cells],
+                [cell.orientation for cell in cells],
+                [cell.energy for cell in cells],
+                [cell.genome_start for cell in cells],
+                [cell.id for cell in cells]
+            )
+            self.ttl[slots] = [cell.ttl for cell in cells]
+            self.counter[slots] = [cell.internal_counter for cell in cells]
+            self.criteria[slots] = [
+                cell.internal_counter_criteria for cell in cells
+            ]
+
+    def store(self):
+        # write the array state back into the object world
+        world = self.world
+        world.rm_all()
+        grid = self.grid
+        types = grid.types
+
+        world.set_terrain(grid.inner(types) == ROCK)
+
+        for index, prod in zip(self.geysers.tolist(),
+                               self.geyser_prod.tolist()):
+            geyser = Geyser(world, world.get_id(), grid.coord(index), prod)
+            geyser.energy = int(self.energy_at[index])
+            world.add_entity(geyser)
+
+        for index in np.nonzero(types == ENERGY)[0].tolist():
+            world.drop_energy(index, int(self.energy_at[index]))
+
+        for slot in np.nonzero(self.alive[:self.size])[0].tolist():
+            cell = Cell(
+                world,
+                world.get_id(),
+                grid.coord(int(self.index[slot])),
+                tuple(self.color[slot].tolist()),
+                self.genome[slot].tobytes(),
+                int(self.energy[slot]),
+                int(self.orientation[slot]),
+                int(self.start[slot])
+            )
+            cell.ttl = int(self.ttl[slot])
+            cell.internal_counter = int(self.counter[slot])
+            cell.internal_counter_criteria = int(self.criteria[slot])
+            world.add_entity(cell)
+
+    def dump_energy(self, index: int, energy: int, max_energy: int):
+        # scalar port of Entity.dump_energy, returns the energy left behind
+        delta = energy - max_energy
+        types = self.grid.types_view
+        ids = self.grid.ids_view
+        offsets = self.grid.offsets
+        orientation_order = self.rng.permutation(8).tolist()
+        for orientation in orientation_order:
+            target = index + offsets[orientation]
+            if types[target] == EMPTY:
+                types[target] = ENERGY
+                self.energy_at[target] = delta
+                return max_energy
+
+        energy_targets = {}
+        for orientation in orientation_order:
+            target = index + offsets[orientation]
+            if types[target] == ENERGY:
+                energy_targets[int(self.energy_at[target])] = target
+            elif types[target] == CELL:
+                energy_targets[int(self.energy[ids[target]])] = target
+        if not energy_targets:
+            return energy
+
+        _, target = sorted(energy_targets.items())[0]
+        if types[target] == ENERGY:
+            self.energy_at[target] += delta
+        else:
+            slot = ids[target]
+            self.alive[slot] = False
+            ids[target] = NO_ID
+            types[target] = ENERGY
+            self.energy_at[target] = delta + self.energy[slot]
+        return max_energy
+
+    def rainy(self, drop_energy: int = 10000):
+        max_x, max_y = self.world.max_coord
+        x = self.rng.integers(0, max_x, endpoint=True)
+        y = self.rng.integers(0, max_y, endpoint=True)
+        index = self.grid.index((int(x), int(y)))
+        if self.grid.types_view[index] == EMPTY:
+            self.grid.types_view[index] = ENERGY
+            self.energy_at[index] = drop_energy
+
+    def step_geysers(self):
+        if not len(self.geysers):
+            return
+        if self.world.geyser:
+            self.energy_at[self.geysers] += self.geyser_prod
+        overflow = self.geysers[self.energy_at[self.geysers] > 1000]
+        for index in overflow.tolist():
+            self.energy_at[index] = self.dump_energy(
+                index,
+                int(self.energy_at[index]),
+                1000
+            )
+
+    def step_energy(self):
+        low, high = self.region
+        drops = low + np.nonzero(self.grid.types[low:high] == ENERGY)[0]
+        self.total_nolife_objects = len(drops)
+        for index in drops[self.energy_at[drops] > 1000].tolist():
+            self.energy_at[index] = self.dump_energy(
+                index,
+                int(self.energy_at[index]),
+                1000
+            )
+        if not self.world.entropy:
+            return
+        drops = drops[self.grid.types[drops] == ENERGY]
+        self.energy_at[drops] -= 1
+        exhausted = drops[self.energy_at[drops] <= 0]
+        self.grid.types[exhausted] = EMPTY
+        self.energy_at[exhausted] = 0
+
+    def first_per_target(self, candidates, targets, priority):
+        # keep one candidate per target, the one with the lowest priority
+        if not len(candidates):
+            return candidates, targets
+        order = np.argsort(priority[candidates], kind="stable")
+        _, first = np.unique(targets[order], return_index=True)
+        keep = order[first]
+        return candidates[keep], targets[keep]
+
+    def active_slots(self):
+        return np.nonzero(self.alive[:self.size])[0]
+
+    def step_cells(self):
+        # overflowing cells try to drop their surplus first
+        slots = self.active_slots()
+        overflow = slots[self.energy[slots] > self.max_energy[slots]]
+        for slot in overflow.tolist():
+            if self.alive[slot]:
+                self.energy[slot] = self.dump_energy(
+                    int(self.index[slot]),
+                    int(self.energy[slot]),
+                    int(self.max_energy[slot])
+                )
+
+        slots = slots[self.alive[slots]]
+        dead = (
+            (self.energy[slots] > self.max_energy[slots])
+            | (self.energy[slots] <= self.min_energy[slots])
+            | (self.ttl[slots] == 0)
+        )
+        self.kill(slots[dead])
+        slots = slots[~dead]
+        self.total_life_cells = len(slots)
+        if not len(slots):
+            return
+
+        counting = self.counter[slots] < self.criteria[slots]
+        self.counter[slots[counting]] += 1
+
+        priority = np.zeros(self.capacity, dtype=np.int64)
+        priority[slots] = self.rng.permutation(len(slots))
+
+        breeding = self.breed(slots, priority)
+        slots = slots[~np.isin(slots, breeding)]
+        self.execute(slots, priority)
+
+    def breed(self, slots, priority):
+        grid = self.grid
+        candidates = slots[self.energy[slots] >= self.min_division[slots]]
+        if not len(candidates):
+            return candidates
+        direction = self.rng.integers(0, 8, len(candidates))
+        targets = self.index[candidates] + self.offsets[direction]
+        free = grid.types[targets] == EMPTY
+        candidates, targets = self.first_per_target(
+            candidates[free], targets[free], priority
+        )
+        if not len(candidates):
+            return candidates
+        direction = np.nonzero(
+            (targets - self.index[candidates])[:, None] == self.offsets
+        )[1]
+
+        count = len(candidates)
+        genome = self.genome[candidates].copy()
+        color = self.color[candidates].copy()
+        mutants = self.rng.integers(1, 100, count, endpoint=True) \
+            <= genome[:, 107]
+        rows = np.nonzero(mutants)[0]
+        if len(rows):
+            genome[rows, self.rng.integers(0, GENOME_LENGTH, len(rows))] = \
+                self.rng.integers(0, 100, len(rows), endpoint=True)
+            channel = self.rng.integers(0, 3, len(rows))
+            shift = self.rng.integers(-40, 40, len(rows), endpoint=True)
+            color[rows, channel] = np.clip(
+                color[rows, channel] + shift, 0, 255
+            )
+
+        energy = self.energy[candidates] - self.min_division[candidates] // 3
+        remaining = energy * self.genome[candidates, 105] // 100
+        self.energy[candidates] = remaining
+        self.ttl[candidates] -= 1
+
+        self.add_cells(
+            targets,
+            genome,
+            color,
+            direction,
+            energy - remaining
+        )
+        return candidates
+
+    def execute(self, slots, priority):
+        genome = self.genome
+        types = self.grid.types
+        ids = self.grid.ids
+        offsets = self.offsets
+
+        index = self.index[slots]
+        ip = self.start[slots].copy()
+        orientation = self.orientation[slots].copy()
+        energy = self.energy[slots].copy()
+        start = self.start[slots].copy()
+        counter = self.counter[slots].copy()
+        criteria = self.criteria[slots].copy()
+        action = np.full(len(slots), NO_ACTION, dtype=np.int64)
+
+        def next_addr(addr):
+            addr = addr + 1
+            addr[addr == PROGRAM_LENGTH] = 0
+            return addr
+
+        def go_to(rows, addr):
+            addr = genome[slots[rows], addr].astype(np.int64) - 1
+            addr[addr == -1] = PROGRAM_LENGTH - 1
+            return addr
+
+        run = np.arange(len(slots))
+        for _ in range(PROGRAM_LENGTH + 1):
+            if not len(run):
+                break
+            gen = genome[slots[run], ip[run]]
+
+            terminal = (
+                (gen == MOVE) | (gen == EAT_ENERGY)
+                | (gen == EAT_CELL) | (gen == PHOTOSYNTHESIS)
+            )
+            action[run[terminal]] = gen[terminal]
+
+            rows = run[gen == CLOCKWISE]
+            orientation[rows] = (orientation[rows] + 1) % 8
+            energy[rows] -= 1
+
+            rows = run[gen == CCLOCKWISE]
+            orientation[rows] = (orientation[rows] - 1) % 8
+            energy[rows] -= 1
+
+            rows = run[gen == SET_NEW_START]
+            ip[rows] = next_addr(ip[rows])
+            start[rows] = genome[slots[rows], ip[rows]]
+
+            checks = run[(gen >= CHECK_OBSTACLE) & (gen <= CHECK_RELATIVE)]
+            if len(checks):
+                check_gen = genome[slots[checks], ip[checks]]
+                ip[checks] = next_addr(ip[checks])
+                target = index[checks] + offsets[orientation[checks]]
+                seen = types[target]
+                hit = np.select(
+                    [
+                        check_gen == CHECK_OBSTACLE,
+                        check_gen == CHECK_FOOD,
+                        check_gen == CHECK_CELL,
+                        check_gen == CHECK_EMPTY,
+                    ],
+                    [
+                        (seen != ENERGY) & (seen != CELL) & (seen != EMPTY),
+                        seen == ENERGY,
+                        seen == CELL,
+                        seen == EMPTY,
+                    ],
+                    default=seen == CELL
+                )
+                relative = check_gen == CHECK_RELATIVE
+                if relative.any():
+                    rows = np.nonzero(relative & hit)[0]
+                    if len(rows):
+                        diff = np.count_nonzero(
+                            genome[slots[checks[rows]]]
+                            != genome[ids[target[rows]]],
+                            axis=1
+                        )
+                        hit[rows[diff > 2]] = False
+                jump = checks[hit]
+                ip[jump] = go_to(jump, ip[jump])
+                # a failed relative check is free, every other check costs 1
+                energy[checks[hit | ~relative]] -= 1
+
+            rows = run[gen == CHECK_COUNTER]
+            rows = rows[counter[rows] >= criteria[rows]]
+            ip[rows] = go_to(rows, next_addr(ip[rows]))
+            counter[rows] = 0
+
+            rows = run[gen == SET_COUNTER]
+            ip[rows] = next_addr(ip[rows])
+            criteria[rows] = genome[slots[rows], ip[rows]]
+
+            rows = run[gen == GO_TO]
+            ip[rows] = go_to(rows, next_addr(ip[rows]))
+
+            run = run[~terminal]
+            ip[run] = next_addr(ip[run])
+
+        self.orientation[slots] = orientation
+        self.energy[slots] = energy
+        self.start[slots] = start
+        self.counter[slots] = counter
+        self.criteria[slots] = criteria
+        self.ttl[slots[action == NO_ACTION]] -= 1
+
+        self.resolve(slots, action, priority)
+
+    def resolve(self, slots, action, priority):
+        grid = self.grid
+        types = grid.types
+        ids = grid.ids
+        sun = self.world.sun
+        sun_level = self.world.sun_level
+
+        target = self.index[slots] + self.offsets[self.orientation[slots]]
+
+        rows = np.nonzero(action == PHOTOSYNTHESIS)[0]
+        feed = slots[rows]
+        if sun:
+            feed = feed[self.energy[feed] < self.max_energy[feed]]
+            self.energy[feed] += sun_level
+        self.ttl[slots[rows]] -= 1
+
+        # eat_cell, the prey is looked up before anybody is removed
+        rows = np.nonzero(action == EAT_CELL)[0]
+        hungry = rows[
+            (self.energy[slots[rows]] < self.max_energy[slots[rows]])
+            & (types[target[rows]] == CELL)
+        ]
+        prey = ids[target[hungry]]
+        hungry = hungry[~np.isin(slots[hungry], prey)]
+        eaters, prey_index = self.first_per_target(
+            slots[hungry], target[hungry], priority
+        )
+        prey = ids[prey_index]
+        self.energy[eaters] += self.energy[prey]
+        self.kill(prey, leave_energy=False)
+        paid = slots[rows]
+        paid = paid[self.alive[paid]]
+        self.energy[paid] -= 1 + self.energy[paid] // 100
+        self.ttl[paid] -= 1
+
+        live = self.alive[slots]
+
+        # eat_energy
+        rows = np.nonzero((action == EAT_ENERGY) & live)[0]
+        hungry = rows[
+            (self.energy[slots[rows]] < self.max_energy[slots[rows]])
+            & (types[target[rows]] == ENERGY)
+        ]
+        eaters, drops = self.first_per_target(
+            slots[hungry], target[hungry], priority
+        )
+        eatable = self.max_energy[eaters] - self.energy[eaters]
+        amount = self.energy_at[drops]
+        whole = amount <= eatable
+        self.energy[eaters] += np.where(whole, amount, eatable)
+        self.energy_at[drops] = np.where(whole, 0, amount - eatable)
+        types[drops[whole]] = EMPTY
+        paid = slots[rows]
+        self.energy[paid] -= 1 + self.energy[paid] // 100
+        self.ttl[paid] -= 1
+
+        # move
+        rows = np.nonzero((action == MOVE) & live)[0]
+        paid = slots[rows]
+        free = rows[types[target[rows]] == EMPTY]
+        movers, destination = self.first_per_target(
+            slots[free], target[free], priority
+        )
+        grid.ids[self.index[movers]] = NO_ID
+        types[self.index[movers]] = EMPTY
+        grid.ids[destination] = movers
+        types[destination] = CELL
+        self.index[movers] = destination
+        self.energy[paid] -= 1 + self.energy[paid] // 100
+        self.ttl[paid] -= 1
+
+    def tick(self):
+        if self.world.rain:
+            self.rainy(self.world.rain_energy)
+        self.step_geysers()
+        self.step_energy()
+        self.step_cells()
+
+        if self.size > 1024 and self.size > 2 * self.total_life_cells:
+            self.compact()
+        self.ticks += 1
+
+    def run(self, ticks: int):
+        for _ in range(ticks):
+            self.tick()
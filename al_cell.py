@@ -1,9 +1,13 @@
-from random import randint
+from weakref import WeakValueDictionary
 from termcolor import colored
-from al_entities import Entity, Energy
+from al_entities import Entity
+from al_grid import EMPTY
+from al_profile import profiler
 
 
 commands = {}
+# unwrapped handlers and their names, commands may hold profiling wrappers
+handlers = {}
 
 
 def command_handler(command):
@@ -12,74 +16,171 @@ def command_handler(command):
             return func(self)
 
         commands[command] = inner
+        handlers[command] = (inner, func.__name__)
 
         return inner
     return wrapper
 
 
-class Cell(Entity):
-    def __init__(
-            self,
-            world,
-            eid: int,
-            coord,
-            color,
-            genome,
-            energy,
-            orientation,
-            genome_start=None
-    ):
-        super().__init__(world, eid, coord, color, "Cell", genome)
-        self.orientation = orientation
+class Program():
+    # Genome compiled into a jump table. For every start address the table
+    # holds the number of non-command genes skipped before the next command
+    # gene, that command handler and its address, or None when the genome
+    # has no commands at all.
+    #
+    # The cell properties coded in the genome are derived here once too, so
+    # every cell of the genome refers to the same int objects.
+    def __init__(self, genome: tuple):
+        self.genome = genome
+        self.table = None
+        self.build()
 
         # genome: [---instructions index from 0 to 100---] + [cell property]
         # where cel property is:
 
-        # genome start address
-        self.genome_start = genome_start if genome_start else self.genome[101]
+        # 101 - genome start address
 
         # cell time to live *10, moves
-        self.ttl = self.genome[102] * 10
+        self.ttl = genome[102] * 10
 
         # max cell energy *10
-        self.max_energy = self.genome[103] * 10
+        self.max_energy = genome[103] * 10
 
         # min cell energy 10 + x
-        self.min_energy = 10 + self.genome[104]
+        self.min_energy = 10 + genome[104]
 
         # 105 - % of energy remaining after cell division
 
         # 106 - min energy level cell division
-        self.min_energy_division = 500 + self.genome[106]
+        self.min_energy_division = 500 + genome[106]
 
         # 107 - mutation probability, %
 
-        self.energy = self.max_energy if energy is None else energy
-        self.len_genome = len(self.genome) - 1
-
+        self.len_genome = len(genome) - 1
         self.breed_cost = self.min_energy_division // 3
 
+        # (gene, occurrences) of every command gene, see Statistics
+        counts = {}
+        for gene in genome[:101]:
+            if gene in commands:
+                counts[gene] = counts.get(gene, 0) + 1
+        self.commands = tuple(counts.items())
+
+    def build(self):
+        genome = self.genome
+        table = [None] * 101
+        jump = None
+        for addr in range(201, -1, -1):
+            addr %= 101
+            handler = commands.get(genome[addr])
+            if handler is not None:
+                jump = (0, handler, addr)
+            elif jump is not None:
+                jump = (jump[0] + 1, jump[1], jump[2])
+            table[addr] = jump
+        self.table = tuple(table)
+
+
+# compiled programs shared by every cell with an equal genome, a program
+# is evicted as soon as no cell refers to it any more
+programs = WeakValueDictionary()
+
+
+def compile_genome(genome: tuple):
+    program = programs.get(genome)
+    if program is None:
+        program = Program(genome)
+        programs[genome] = program
+    return program
+
+
+def profile_commands(enabled: bool):
+    for command, (handler, name) in handlers.items():
+        commands[command] = profiler.wrap(f"command {command: >2} {name}",
+                                          handler) if enabled else handler
+    # compiled programs hold the handlers themselves
+    for program in list(programs.values()):
+        program.build()
+
+
+class Cell(Entity):
+    __slots__ = (
+        "color",
+        "genome",
+        "genome_id",
+        "orientation",
+        "max_energy",
+        "program",
+        "genome_start",
+        "ttl",
+        "min_energy",
+        "min_energy_division",
+        "len_genome",
+        "breed_cost",
+        "internal_counter",
+        "internal_counter_criteria",
+        "gen_addr",
+    )
+
+    name = "Cell"
+
+    def __init__(
+            self,
+            world,
+            eid: int,
+            coord,
+            color,
+            genome,
+            energy,
+            orientation,
+            genome_start=None,
+            program=None,
+            parent=None
+    ):
+        super().__init__(world, eid, coord)
+        self.color = color
+        self.genome_id = world.genomes.acquire(genome, parent)
+        self.genome = world.genomes[self.genome_id]
+        self.orientation = orientation
+        if program is None:
+            program = compile_genome(self.genome)
+        self.program = program
+
+        # genome start address
+        self.genome_start = genome_start if genome_start else self.genome[101]
+
+        self.ttl = program.ttl
+        self.max_energy = program.max_energy
+        self.min_energy = program.min_energy
+        self.min_energy_division = program.min_energy_division
+        self.energy = self.max_energy if energy is None else energy
+        self.len_genome = program.len_genome
+        self.breed_cost = program.breed_cost
+
         self.internal_counter = 0
         self.internal_counter_criteria = 100
 
         self.gen_addr = None
 
+    def retire(self):
+        # a pooled cell must not keep its program and genome from being
+        # evicted, see compile_genome and GenomePool
+        self.genome = None
+        self.genome_id = None
+        self.program = None
+
     def eat_entity(self, entity):
         self.energy += entity.energy
         self.world.remove_entity(entity)
 
     def print_info(self):
-        genome_stat = {n: 0 for n in commands}
-        for entity in self.world.entities.values():
-            if entity.name == "Cell":
-                for gen in entity.genome[:101]:
-                    if gen in genome_stat:
-                        genome_stat[gen] += 1
+        gene_usage = self.world.stats.gene_usage
+        genome_stat = {n: gene_usage[n] for n in commands}
         total = sum(genome_stat.values())
 
         print("\n".join(f"{n: >2} {((m * 100) // total): >3}%  {m}"
                         for n, m in genome_stat.items()))
-        print(f"\n{self.genome}\n")
+        print(f"\n{tuple(self.genome)}\n")
         for i in range(101):
             if i == self.genome_start:
                 color = "red"
@@ -119,22 +220,22 @@ class Cell(Entity):
             self.gen_addr = 0
 
     def make_mutant(self):
+        randint = self.world.rng.randint
         new_genome = list(self.genome)
         gen_change = randint(0, self.len_genome)
         new_gen = randint(0, 100)
         new_genome[gen_change] = new_gen
-        return new_genome
+        return bytes(new_genome)
 
     def breed(self):
         if self.energy < self.min_energy_division:
             return False
 
+        randint = self.world.rng.randint
         breed_direction = randint(0, 7)
-        x, y = self.coord
-        dx, dy = self.directions[breed_direction]
-        new_coord = (x + dx, y + dy)
-        check = self.world.who_is_there(new_coord)
-        if check is not None:
+        grid = self.world.grid
+        new_index = self.index + grid.offsets[breed_direction]
+        if grid.types_view[new_index] != EMPTY:
             return False
 
         if randint(1, 100) <= self.genome[107]:
@@ -151,23 +252,30 @@ class Cell(Entity):
                 change_color_val = 0
             color[change_color] = change_color_val
             color = tuple(color)
+            program = None
+            parent = self.genome_id
         else:
             new_genome = self.genome
             color = self.color
+            program = self.program
+            parent = None
 
         self.energy -= self.breed_cost
         remaining_energy = self.energy * self.genome[105] // 100
         new_energy = self.energy - remaining_energy
         self.energy = remaining_energy
 
-        cell = Cell(
+        cell = self.world.pool.new(
+            Cell,
             self.world,
             self.world.get_id(),
-            new_coord,
+            grid.coord(new_index),
             color,
             new_genome,
             new_energy,
-            breed_direction
+            breed_direction,
+            program=program,
+            parent=parent
         )
 
         self.world.add_entity(cell)
@@ -182,9 +290,9 @@ class Cell(Entity):
 
     @command_handler(0)
     def move(self):
-        name, _, new_coord = self.check_move()
+        name, _, new_index = self.check_move()
         if name is None:
-            self.move_to(new_coord)
+            self.move_to(new_index)
         self.energy -= 1 + self.energy // 100
         self.ttl -= 1
         return True
@@ -246,12 +354,8 @@ class Cell(Entity):
         name, check, _ = self.check_move()
         if name != "Cell":
             return
-        diff = 0
-        for gen1, gen2 in zip(self.genome, check.genome):
-            if gen1 != gen2:
-                diff += 1
-                if diff > 2:
-                    return
+        if not self.world.genomes.related(self.genome_id, check.genome_id):
+            return
         self.go_to_genome_addr()
         self.energy -= 1
 
@@ -259,12 +363,15 @@ class Cell(Entity):
     def eat_energy(self):
         if self.energy < self.max_energy:
             eatable_energy = self.max_energy - self.energy
-            name, check, _ = self.check_move()
+            name, check, index = self.check_move()
             if name == "Energy":
-                if check.energy < eatable_energy:
+                if check is None:
+                    self.energy += self.world.field.take(index, eatable_energy)
+                elif check.energy < eatable_energy:
                     self.eat_entity(check)
                 else:
                     check.energy -= eatable_energy
+                    self.world.stats.add_energy(-eatable_energy)
                     self.energy += eatable_energy
         self.energy -= 1 + self.energy // 100
         self.ttl -= 1
@@ -316,17 +423,9 @@ class Cell(Entity):
             self.world.remove_entity(self)
             if self.energy <= 0:
                 return
-            energy = Energy(
-                self.world,
-                self.world.get_id(),
-                self.coord,
-                self.energy
-            )
-            self.world.add_entity(energy)
+            self.world.drop_energy(self.index, self.energy)
             return
 
-        self.world.total_life_cells += 1
-
         if self.internal_counter < self.internal_counter_criteria:
             self.internal_counter += 1
 
@@ -335,14 +434,29 @@ class Cell(Entity):
 
         self.gen_addr = self.genome_start
 
-        for _ in range(102):
-            gen = self.genome[self.gen_addr]
-            if gen in commands:
-                if commands[gen](self):
-                    return
+        # same 102 step budget as walking the genome gene by gene, the
+        # compiled table lets non-command genes be skipped in one go
+        table = self.program.table
+        steps = 102
+        while True:
+            jump = table[self.gen_addr]
+            if jump is None:
+                break
+            skip, command, addr = jump
+            if skip >= steps:
+                break
+            steps -= skip + 1
+            self.gen_addr = addr
+            if command(self):
+                return
             self.next_gen_addr()
         self.ttl -= 1
 
     def __str__(self):
         return f"{self.name}, Id: {self.id}, Energy: {self.energy}, "\
             f"ttl: {self.ttl}"
+
+
+profiler.on_toggle(profile_commands)
+profiler.instrument(Cell, "breed", "Cell.breed")
+profiler.instrument(Entity, "dump_energy", "Entity.dump_energy")
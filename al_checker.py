@@ -0,0 +1,238 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import numpy as np
+from al_random import RandomStream
+from al_profile import profiler
+
+
+class BlockStreams():
+    # Stands in for World.rng while a CheckerEngine runs. Every block of the
+    # grid draws from a stream of its own, so what happens in a block does
+    # not depend on the thread running it or on the blocks running beside
+    # it. Anything outside of the blocks, e.g. rain, draws from the world's
+    # stream, which also keeps serving its state for snapshots.
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    def stream(self):
+        return getattr(self.local, "stream", self.default)
+
+    def random(self):
+        return self.stream().random()
+
+    def randint(self, a: int, b: int):
+        return self.stream().randint(a, b)
+
+    def randints(self, a: int, b: int, count: int):
+        return self.stream().randints(a, b, count)
+
+    def shuffle(self, items: list):
+        self.stream().shuffle(items)
+
+    def __getattr__(self, name):
+        return getattr(self.default, name)
+
+
+class CheckerEngine():
+    # Updates the entities of an object world in conflict free phases.
+    #
+    # The grid is cut into square blocks coloured like a checkerboard in
+    # both directions, four colours in all, and every tick runs one phase
+    # per colour. An entity reads and writes no further than its 8
+    # neighbourhood, so two blocks of one colour, at least a block apart,
+    # never touch the same position and the blocks of a phase run on a
+    # thread pool. Within a block entities are updated in position order,
+    # which makes the update order independent of entity ids.
+    #
+    # The world's shared bookkeeping (ids, the entity tables, the pool and
+    # the statistics) is serialised by a lock, wrappers are only installed
+    # with more than one worker. With one worker the blocks run in order on
+    # the calling thread. Either way a run is repeatable from the world's
+    # seed, only the ids handed out to new entities depend on thread timing.
+    # True parallel speedup needs a free-threaded CPython build.
+    batch = 256
+
+    def __init__(
+            self,
+            world,
+            workers: int | None = None,
+            block: int = 16
+    ):
+        if block < 2:
+            raise ValueError("blocks must be at least 2 positions wide")
+        self.world = world
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.workers = max(1, workers)
+        self.block = block
+        width, height = world.size
+        self.columns = -(-width // block)
+        self.rows = -(-height // block)
+        self.stride = world.grid.stride
+
+        self.seeds = world.rng.spawn(1)[0].spawn(self.columns * self.rows)
+        self.streams = {}
+        self.rng = BlockStreams(world.rng)
+        world.rng = self.rng
+
+        self.lock = threading.RLock()
+        self.locked = []
+        self.executor = None
+        if self.workers > 1:
+            self.executor = ThreadPoolExecutor(self.workers)
+            for owner, name in (
+                    (world, "get_id"),
+                    (world, "add_entity"),
+                    (world, "remove_entity"),
+                    (world.pool, "new"),
+                    (world.stats, "add_energy"),
+                    (world.stats, "add_free_energy"),
+            ):
+                setattr(owner, name, self.serialised(getattr(owner, name)))
+                self.locked.append((owner, name))
+
+    def serialised(self, func):
+        lock = self.lock
+
+        def inner(*args, **kwargs):
+            with lock:
+                return func(*args, **kwargs)
+
+        return inner
+
+    @property
+    def ticks(self):
+        return self.world.ticks
+
+    @property
+    def total_life_cells(self):
+        return self.world.total_life_cells
+
+    @property
+    def total_nolife_objects(self):
+        return self.world.total_nolife_objects
+
+    def locate(self, indices):
+        # block and colour of grid indices
+        y, x = np.divmod(indices, self.stride)
+        block_y = (y - 1) // self.block
+        block_x = (x - 1) // self.block
+        blocks = block_y * self.columns + block_x
+        colours = (block_y % 2) * 2 + block_x % 2
+        return blocks, colours
+
+    def stream(self, block: int):
+        stream = self.streams.get(block)
+        if stream is None:
+            seed = int(self.seeds[block].generate_state(1, np.uint64)[0])
+            stream = self.streams[block] = RandomStream(seed, self.batch)
+        return stream
+
+    def update_blocks(self, blocks: list):
+        local = self.rng.local
+        entities = self.world.entities
+        energy = 0
+        try:
+            for stream, keys in blocks:
+                local.stream = stream
+                for key in keys:
+                    entity = entities[key]
+                    before = entity.energy
+                    entity()
+                    energy += entity.energy - before
+        finally:
+            local.__dict__.pop("stream", None)
+        return energy
+
+    def run_phase(self, blocks: dict):
+        # streams are created here, never by the workers
+        work = [(self.stream(block), keys) for block, keys in blocks.items()]
+        if self.executor is None:
+            return self.update_blocks(work)
+        # no more chunks than blocks, a worker never gets an empty one
+        workers = min(self.workers, len(work))
+        return sum(
+            self.executor.map(
+                self.update_blocks,
+                [work[n::workers] for n in range(workers)]
+            )
+        )
+
+    def update_entities(self):
+        # Like World.update_entities, an entity woken during the tick gets
+        # its update in this tick yet when its phase is still to come.
+        world = self.world
+        active = world.active
+        entities = world.entities
+        count = len(active)
+        keys = np.fromiter(active, dtype=np.int64, count=count)
+        indices = np.fromiter(
+            (entity.index for entity in active.values()),
+            dtype=np.int64,
+            count=count
+        )
+        blocks, colours = self.locate(indices)
+        order = np.lexsort((indices, blocks, colours))
+        phases = [{}, {}, {}, {}]
+        for key, block, colour in zip(
+                keys[order].tolist(),
+                blocks[order].tolist(),
+                colours[order].tolist()
+        ):
+            phases[colour].setdefault(block, []).append(key)
+
+        limit = world.next_entity_id
+        woken = world.woken = []
+        energy = 0
+        for phase, phase_blocks in enumerate(phases):
+            if phase_blocks:
+                energy += self.run_phase(phase_blocks)
+            if not woken:
+                continue
+            ids = [key for key in set(woken) if key < limit]
+            woken.clear()
+            if not ids or phase == 3:
+                continue
+            blocks, colours = self.locate(
+                np.array([entities[key].index for key in ids], dtype=np.int64)
+            )
+            changed = set()
+            for key, block, colour in zip(
+                    ids, blocks.tolist(), colours.tolist()
+            ):
+                if colour > phase:
+                    phases[colour].setdefault(block, []).append(key)
+                    changed.add((colour, block))
+            for colour, block in changed:
+                phases[colour][block].sort(key=lambda key: entities[key].index)
+        world.woken = None
+        world.stats.energy += energy
+
+    def tick(self):
+        world = self.world
+        world.begin_tick()
+        profiler.run("CheckerEngine.update_entities", self.update_entities)
+        world.end_tick()
+
+    def run(self, ticks: int):
+        for _ in range(ticks):
+            self.tick()
+
+    def close(self):
+        # hand the world back in its normal single threaded state
+        for owner, name in self.locked:
+            delattr(owner, name)
+        self.locked = []
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.world.rng is self.rng:
+            self.world.rng = self.rng.default
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,7 +1,21 @@
-from random import shuffle
+from al_grid import TYPE_NAMES, EMPTY, NO_ID
 
 
 class Entity():
+    # Entities are slotted: a world holds hundreds of thousands of them, and
+    # a per instance __dict__ would cost more than the state it keeps. What
+    # is the same for every instance of a type (name, colour, the defaults
+    # below) lives on the class, a subclass with per instance values for
+    # them adds its own slots. Only the grid index is stored, the coord is
+    # derived from it.
+    __slots__ = ("world", "id", "index", "inactive", "energy")
+
+    name = None
+    color = 0xFFFFFF
+    genome = None
+    max_energy = 1000
+    orientation = 0
+
     directions = {
         0: (-1, -1),
         1: (0, -1),
@@ -18,80 +32,78 @@ class Entity():
             world,
             eid: int,
             coord: tuple = (0, 0),
-            color: int = 0xFFFFFF,
-            name: int | None = None,
-            genome: tuple | None = None,
             energy: int = 0
     ):
-        self.name = name
-        self.id = eid
-        self.color = color
-        self.coord = coord
         self.world = world
-        self.genome = genome
+        self.id = eid
+        self.index = world.grid.index(coord)
         self.inactive = False
         self.energy = energy
-        self.max_energy = 1000
-        self.orientation = 0
-
-    def move_to(self, new_coord):
-        coord = self.coord
-        color = self.color
-        bg_color = self.world.bg_color
-        self.world.draw_pixel(coord, bg_color)
-        self.world.draw_pixel(new_coord, color)
-        self.coord = new_coord
-        self.world.collide_list.pop(coord)
-        self.world.collide_list[new_coord] = self.id
+
+    @property
+    def coord(self):
+        return self.world.grid.coord(self.index)
+
+    def move_to(self, new_index):
+        self.world.move_entity(self, new_index)
 
     def check_move(self, orientation=None):
-        if not orientation:
+        if orientation is None:
             orientation = self.orientation
-        x, y = self.coord
-        dx, dy = self.directions[orientation]
-        new_coord = (x + dx, y + dy)
-        check = self.world.who_is_there(new_coord)
-        name = None
-        if check is not None:
-            name = check.name
-        return (name, check, new_coord)
+        grid = self.world.grid
+        new_index = self.index + grid.offsets[orientation]
+        type_code = grid.types_view[new_index]
+        if type_code == EMPTY:
+            return (None, None, new_index)
+        entity_id = grid.ids_view[new_index]
+        if entity_id == NO_ID:
+            # terrain or the world edge
+            return (TYPE_NAMES[type_code], None, new_index)
+        check = self.world.entities[entity_id]
+        return (check.name, check, new_index)
 
     def dump_energy(self):
         if self.energy <= self.max_energy:
             return
         delta = self.energy - self.max_energy
         orientation_order = list(self.directions.keys())
-        shuffle(orientation_order)
+        self.world.rng.shuffle(orientation_order)
         for orientation in orientation_order:
-            name, _, coord = self.check_move(orientation)
+            name, _, index = self.check_move(orientation)
             if name is None:
-                energy = Energy(self.world, self.world.get_id(), coord, delta)
-                self.world.add_entity(energy)
+                self.world.drop_energy(index, delta)
                 self.energy = self.max_energy
                 return
+        field = self.world.field
         energy_entities = {}
         for orientation in orientation_order:
-            name, check, _ = self.check_move(orientation)
+            name, check, index = self.check_move(orientation)
             if name in ("Energy", "Cell"):
-                energy_entities[check.energy] = check
+                # field energy has no entity, see EnergyField
+                energy = field.view[index] if check is None else check.energy
+                energy_entities[energy] = (check, index)
 
         if energy_entities:
-            _, check = sorted(energy_entities.items())[0]
-            if check.name == "Energy":
+            _, (check, index) = sorted(energy_entities.items())[0]
+            if check is None:
+                field.add(index, delta)
+                self.energy = self.max_energy
+            elif check.name == "Energy":
                 check.energy += delta
+                self.world.stats.add_energy(delta)
+                self.world.wake(check)
                 self.energy = self.max_energy
             else:
-                energy = Energy(
-                    self.world,
-                    self.world.get_id(),
-                    check.coord,
-                    delta + check.energy
-                )
+                energy = delta + check.energy
                 self.world.remove_entity(check)
-                self.world.add_entity(energy)
+                self.world.drop_energy(index, energy)
                 self.energy = self.max_energy
             return
 
+    def retire(self):
+        # drop what a pooled instance must not keep alive, see EntityPool
+        pass
+
     def print_info(self):
         print(self)
 
@@ -102,17 +114,12 @@ class Entity():
         return f"{self.name}, Id: {self.id}, Energy: {self.energy}"
 
 
-class Rock(Entity):
-    def __init__(
-            self,
-            world,
-            eid: int,
-            coord: tuple = (0, 0),
-    ):
-        super().__init__(world, eid, coord, 0xff0000, "Rock")
+class Geyser(Entity):
+    __slots__ = ("prod_energy",)
 
+    name = "Geyser"
+    color = 0xff0000
 
-class Geyser(Entity):
     def __init__(
             self,
             world,
@@ -120,16 +127,25 @@ class Geyser(Entity):
             coord: tuple = (0, 0),
             prod_energy: int = 500
     ):
-        super().__init__(world, eid, coord, 0xff0000, "Geyser")
+        super().__init__(world, eid, coord)
         self.prod_energy = prod_energy
 
     def __call__(self):
+        if self.inactive:
+            return
+
         if self.world.geyser:
             self.energy += self.prod_energy
         self.dump_energy()
+        if not self.world.geyser and self.energy <= self.max_energy:
+            self.world.sleep(self)
 
 
 class Energy(Entity):
+    __slots__ = ()
+
+    name = "Energy"
+
     def __init__(
             self,
             world,
@@ -137,7 +153,7 @@ class Energy(Entity):
             coord,
             energy
     ):
-        super().__init__(world, eid, coord, 0xFFFFFF, "Energy", energy=energy)
+        super().__init__(world, eid, coord, energy)
 
     def __call__(self):
         if self.inactive:
@@ -145,9 +161,9 @@ class Energy(Entity):
 
         self.dump_energy()
 
-        self.world.total_nolife_objects += 1
-
         if not self.world.entropy:
+            if self.energy <= self.max_energy:
+                self.world.sleep(self)
             return
 
         self.energy -= 1
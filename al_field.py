@@ -0,0 +1,103 @@
+import numpy as np
+from al_grid import EMPTY, ENERGY, NO_ID
+
+
+class EnergyField():
+    # Free energy as one value per grid position instead of Energy entities.
+    #
+    # A position holding energy has the ENERGY type and no entity id, so
+    # cells see it through check_move like a drop. Entities drop, add and
+    # take energy at single positions, while overflow spreading and entropy
+    # are applied to the whole array once per tick by step(). An overflowing
+    # position passes its surplus to one random neighbour, empty or holding
+    # energy, and keeps it when that neighbour is anything else; unlike an
+    # Energy entity it never dumps onto a cell.
+    max_energy = 1000
+    color = 0xFFFFFF
+
+    def __init__(self, world):
+        self.world = world
+        self.values = np.zeros(len(world.grid.types), dtype=np.int64)
+        self.view = memoryview(self.values)
+
+    def drop(self, index: int, energy: int):
+        world = self.world
+        world.grid.place(index, NO_ID, ENERGY)
+        self.view[index] = energy
+        world.stats.add_free_energy(1, energy)
+        world.renderer.draw_pixel(world.grid.coord(index), self.color)
+
+    def add(self, index: int, energy: int):
+        self.view[index] += energy
+        self.world.stats.add_free_energy(0, energy)
+
+    def take(self, index: int, energy: int):
+        # up to energy from the position, it is cleared once exhausted
+        value = self.view[index]
+        world = self.world
+        if value > energy:
+            self.view[index] = value - energy
+            world.stats.add_free_energy(0, -energy)
+            return energy
+        self.view[index] = 0
+        world.grid.clear(index)
+        world.stats.add_free_energy(-1, -value)
+        world.renderer.erase_pixel(world.grid.coord(index))
+        return value
+
+    def indices(self):
+        return np.nonzero(self.world.grid.types == ENERGY)[0]
+
+    def mask(self):
+        grid = self.world.grid
+        return grid.inner(grid.types) == ENERGY
+
+    def clear(self):
+        self.values[:] = 0
+
+    def step(self):
+        world = self.world
+        grid = world.grid
+        types = grid.types
+        values = self.values
+        cells = 0
+
+        over = np.nonzero(values > self.max_energy)[0]
+        if len(over):
+            offsets = np.array(grid.offsets, dtype=np.int64)
+            targets = over + offsets[world.rng.randints(0, 7, len(over))]
+            free = np.isin(types[targets], (EMPTY, ENERGY))
+            over = over[free]
+            targets = targets[free]
+            surplus = values[over] - self.max_energy
+            values[over] -= surplus
+            np.add.at(values, targets, surplus)
+            new = np.unique(targets[types[targets] == EMPTY])
+            types[new] = ENERGY
+            self.draw(new, self.color)
+            cells += len(new)
+
+        decayed = 0
+        if world.entropy:
+            drops = self.indices()
+            total = int(values[drops].sum())
+            values[drops] -= 1
+            exhausted = drops[values[drops] <= 0]
+            types[exhausted] = EMPTY
+            values[exhausted] = 0
+            self.draw(exhausted, None)
+            decayed = total - int(values[drops].sum())
+            cells -= len(exhausted)
+
+        world.stats.add_free_energy(cells, -decayed)
+
+    def draw(self, indices, color):
+        if not len(indices):
+            return
+        grid = self.world.grid
+        mask = np.zeros(len(grid.types), dtype=bool)
+        mask[indices] = True
+        if color is None:
+            self.world.renderer.erase_mask(grid.inner(mask))
+        else:
+            self.world.renderer.draw_mask(grid.inner(mask), color)
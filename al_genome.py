@@ -0,0 +1,75 @@
+class GenomePool():
+    # Interned genomes of one world.
+    #
+    # Every distinct genome is kept once, as bytes, under a stable id. Cells
+    # hold the interned object and its id, so cells of one lineage share a
+    # single genome, equal genomes compare by id, and saving or statistics
+    # can work per genome instead of per cell. Live cells are counted per
+    # genome, an extinct genome is dropped and its id is never reused.
+    #
+    # kin caches whether two genomes are relatives, that is differ in at
+    # most two genes, see Cell.check_relative. A mutant is its parent's
+    # relative by construction and is linked when it is bred, any other
+    # pair is compared once when first asked for. Links go with the genome.
+    def __init__(self):
+        self.ids = {}
+        self.genomes = {}
+        self.users = {}
+        self.kin = {}
+        self.next_id = 0
+
+    def acquire(self, genome, parent: int | None = None):
+        # parent is the id of the genome this one was mutated from
+        genome = bytes(genome)
+        genome_id = self.ids.get(genome)
+        if genome_id is None:
+            genome_id = self.next_id
+            self.next_id += 1
+            self.ids[genome] = genome_id
+            self.genomes[genome_id] = genome
+            self.users[genome_id] = 1
+            self.kin[genome_id] = {}
+        else:
+            self.users[genome_id] += 1
+        if parent is not None and parent != genome_id:
+            self.kin[genome_id][parent] = True
+            self.kin[parent][genome_id] = True
+        return genome_id
+
+    def related(self, genome_id: int, other_id: int):
+        if genome_id == other_id:
+            return True
+        kin = self.kin[genome_id]
+        related = kin.get(other_id)
+        if related is None:
+            genome = self.genomes[genome_id]
+            other = self.genomes[other_id]
+            # bytes equal in both genomes xor to zero
+            diff = int.from_bytes(genome, "big") ^ int.from_bytes(other, "big")
+            same = diff.to_bytes(len(genome), "big").count(0)
+            related = len(genome) - same <= 2
+            kin[other_id] = related
+            self.kin[other_id][genome_id] = related
+        return related
+
+    def release(self, genome_id: int):
+        users = self.users[genome_id] - 1
+        if users:
+            self.users[genome_id] = users
+            return
+        del self.users[genome_id]
+        del self.ids[self.genomes.pop(genome_id)]
+        for other_id in self.kin.pop(genome_id):
+            del self.kin[other_id][genome_id]
+
+    def clear(self):
+        self.ids = {}
+        self.genomes = {}
+        self.users = {}
+        self.kin = {}
+
+    def __len__(self):
+        return len(self.genomes)
+
+    def __getitem__(self, genome_id: int):
+        return self.genomes[genome_id]
@@ -0,0 +1,103 @@
+import numpy as np
+
+
+# type codes stored per grid cell
+EMPTY = 0
+ROCK = 1
+GEYSER = 2
+ENERGY = 3
+CELL = 4
+EDGE = 5
+
+TYPE_CODES = {
+    None: EMPTY,
+    "Rock": ROCK,
+    "Geyser": GEYSER,
+    "Energy": ENERGY,
+    "Cell": CELL,
+}
+
+TYPE_NAMES = (None, "Rock", "Geyser", "Energy", "Cell", "Edge")
+
+NO_ID = -1
+
+
+class Grid():
+    # dense occupancy storage: one occupant id and one type code per cell.
+    # The world is padded by a one cell EDGE border, so a neighbour of any
+    # in-world cell is always a valid flat index and needs no bounds check.
+    # Existing buffers can be passed in, e.g. a window of shared memory,
+    # they are used as they are and the border is not painted.
+    def __init__(
+            self,
+            size: tuple,
+            directions: dict,
+            ids=None,
+            types=None
+    ):
+        width, height = size
+        self.width = width
+        self.height = height
+        self.stride = width + 2
+        self.shape = (height + 2, self.stride)
+        length = self.shape[0] * self.shape[1]
+
+        self.ids = np.full(length, NO_ID, dtype=np.int64) if ids is None \
+            else ids
+
+        if types is None:
+            self.types = np.zeros(length, dtype=np.uint8)
+            types = self.types.reshape(self.shape)
+            types[0, :] = EDGE
+            types[-1, :] = EDGE
+            types[:, 0] = EDGE
+            types[:, -1] = EDGE
+        else:
+            self.types = types
+
+        # scalar access through memoryviews on the same buffers is about
+        # twice as fast as indexing the ndarray element by element
+        self.ids_view = memoryview(self.ids)
+        self.types_view = memoryview(self.types)
+
+        self.offsets = tuple(
+            dy * self.stride + dx for dx, dy in
+            (directions[orientation] for orientation in sorted(directions))
+        )
+
+    def index(self, coord: tuple):
+        x, y = coord
+        return (y + 1) * self.stride + x + 1
+
+    def coord(self, index: int):
+        y, x = divmod(index, self.stride)
+        return (x - 1, y - 1)
+
+    def in_bounds(self, coord: tuple):
+        x, y = coord
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def place(self, index: int, entity_id: int, type_code: int):
+        self.ids_view[index] = entity_id
+        self.types_view[index] = type_code
+
+    def clear(self, index: int):
+        self.ids_view[index] = NO_ID
+        self.types_view[index] = EMPTY
+
+    def move(self, index: int, new_index: int):
+        self.ids_view[new_index] = self.ids_view[index]
+        self.types_view[new_index] = self.types_view[index]
+        self.ids_view[index] = NO_ID
+        self.types_view[index] = EMPTY
+
+    def clear_all(self, keep: tuple = ()):
+        mask = self.types != EDGE
+        for type_code in keep:
+            mask &= self.types != type_code
+        self.ids[mask] = NO_ID
+        self.types[mask] = EMPTY
+
+    def inner(self, array):
+        # view of a flat per-cell array as (height, width) without the border
+        return array.reshape(self.shape)[1:-1, 1:-1]
@@ -0,0 +1,411 @@
+from pathlib import Path
+from time import perf_counter
+import pygame
+from al_render import Renderer
+from al_snapshot import SnapshotError
+from al_profile import profiler
+from info_bar import InfoBar
+
+
+class Scheduler():
+    # how many simulation ticks run between two rendered frames:
+    # (button text, frame rate cap, ticks per frame, time budget per frame)
+    # a zero frame rate means uncapped, a None limit means unlimited
+    modes = (
+        ("Speed: 1x", 60, 1, None),
+        ("Speed: 10x", 60, 10, None),
+        ("Speed: 100x", 0, 100, None),
+        ("Speed: max", 0, None, 1 / 20),
+    )
+    # longest a frame spends on the simulation, in seconds. Ticks run slice
+    # by slice, see World.tick_slice, and a tick the budget cuts short goes
+    # on in the next frame, so the window keeps responding on any
+    # population. None lets every frame finish its ticks.
+    budgets = (1 / 60, 1 / 20, 1 / 5, None)
+
+    def __init__(self, mode: int = 0, frame_budget: float | None = 1 / 20):
+        self.mode = mode
+        self.frame_budget = frame_budget
+        self.clock = pygame.time.Clock()
+        self.ticks = 0
+        self.tick_rate = 0.0
+        self.rate_ticks = 0
+        self.rate_start = perf_counter()
+
+    @property
+    def label(self):
+        return self.modes[self.mode][0]
+
+    def next_mode(self):
+        self.mode = (self.mode + 1) % len(self.modes)
+
+    def next_budget(self):
+        budgets = self.budgets
+        if self.frame_budget in budgets:
+            position = budgets.index(self.frame_budget) + 1
+        else:
+            position = 0
+        self.frame_budget = budgets[position % len(budgets)]
+
+    @property
+    def budget_label(self):
+        if self.frame_budget is None:
+            return "none"
+        return f"{self.frame_budget * 1000:.0f} ms"
+
+    def run_frame(self, world, max_ticks: int | None = None):
+        _, _, ticks_per_frame, time_budget = self.modes[self.mode]
+        if max_ticks is not None:
+            ticks_per_frame = max_ticks
+        if time_budget is None or self.frame_budget is not None \
+                and self.frame_budget < time_budget:
+            time_budget = self.frame_budget
+        start = perf_counter()
+        ticks = 0
+        while True:
+            if world.tick_slice():
+                ticks += 1
+                if ticks_per_frame is not None \
+                        and ticks >= ticks_per_frame:
+                    break
+            if time_budget is not None \
+                    and perf_counter() - start >= time_budget:
+                break
+        self.ticks += ticks
+        self.rate_ticks += ticks
+        return ticks
+
+    def wait(self):
+        self.clock.tick(self.modes[self.mode][1])
+        now = perf_counter()
+        if now - self.rate_start >= 1:
+            self.tick_rate = self.rate_ticks / (now - self.rate_start)
+            self.rate_ticks = 0
+            self.rate_start = now
+
+
+class Gui():
+    def __init__(
+            self,
+            world,
+            scale: int = 1,
+            bg_color: tuple | int = 0x000000,
+            profile_path=None,
+            profile_interval: int = 0,
+            frame_budget: float | None = 1 / 20,
+            autosave: int = 0
+    ):
+        pygame.init()
+        logo = pygame.image.load("logo32x32.png")
+        pygame.display.set_icon(logo)
+        pygame.display.set_caption("Artificial life simulator")
+
+        self.world = world
+        self.scale = scale
+        info_bar_height = 5 * 14
+        width, height = world.size
+        width *= scale
+        height = height * scale + info_bar_height
+        self.screen = pygame.display.set_mode((width, height))
+        self.screen.fill(bg_color)
+
+        self.go_life = False
+        self.step_by_step = False
+        self.scheduler = Scheduler(frame_budget=frame_budget)
+        # save a snapshot every autosave ticks, 0 switches it off
+        self.autosave = autosave
+        self.autosave_tick = self.next_autosave(world.ticks)
+
+        self.focus_entity = None
+        self.focus_id = None
+        self.focus_coord = None
+
+        self.files = []
+        self.file_index = 0
+
+        self.info_bar = InfoBar(
+            self.screen,
+            0,
+            self.screen.get_height() - info_bar_height,
+            self.screen.get_width(),
+            info_bar_height,
+            0x808080
+        )
+        self.info_bar.assign_button(0, "Go", self.start_pause)
+        self.info_bar.assign_button(1, "Step", self.step_forward)
+        self.info_bar.assign_button(4, "Add geysers", self.add_geysers)
+        self.info_bar.assign_button(5, "Rm geysers", self.world.rm_geysers)
+        self.info_bar.assign_button(8, "Add life", self.add_life)
+        self.info_bar.assign_button(9, "Clear", self.world.rm_all)
+        self.info_bar.assign_button(10, "Seve world", self.save_world)
+        self.info_bar.assign_button(11, "Load world", self.load_world_init)
+        self.info_bar.assign_button(
+            15,
+            self.scheduler.label,
+            self.speed_toggle
+        )
+        self.toggle_buttons()
+
+        self.renderer = Renderer(self.screen, scale, bg_color)
+        world.attach_renderer(self.renderer)
+
+        if profile_path is not None:
+            profiler.set_dump(profile_path, profile_interval)
+
+    def toggle_buttons(self):
+        world = self.world
+        msg = "Off entropy" if world.entropy else "On entropy"
+        self.info_bar.assign_button(2, msg, self.entropy_toggle)
+        msg = "Off sun" if world.sun else "On sun"
+        self.info_bar.assign_button(3, msg, self.sun_toggle)
+        msg = "Off rain" if world.rain else "On rain"
+        self.info_bar.assign_button(6, msg, self.rain_toggle)
+        msg = "Off geysers" if world.geyser else "On geysers"
+        self.info_bar.assign_button(7, msg, self.geyser_toggle)
+
+    def start_pause(self):
+        self.go_life = not self.go_life
+        text_button = "Pause" if self.go_life else "Go"
+        self.info_bar.assign_button(0, text_button, self.start_pause)
+        if self.go_life:
+            self.info_bar.assign_button(1, "", None)
+            self.info_bar.assign_button(10, "", None)
+            self.info_bar.assign_button(11, "", None)
+            self.clear_file_buttons()
+
+        else:
+            self.info_bar.assign_button(1, "Step", self.step_forward)
+            self.info_bar.assign_button(10, "Seve world", self.save_world)
+            self.info_bar.assign_button(11, "Load world", self.load_world_init)
+
+    def step_forward(self):
+        self.clear_file_buttons()
+        self.step_by_step = True
+        self.go_life = True
+
+    def profile_toggle(self):
+        # the overlay covers part of the world, repaint it once it is gone
+        profiler.toggle()
+        if not profiler.enabled:
+            self.info_bar.overlay_set(None)
+            self.renderer.repaint = True
+
+    def budget_toggle(self):
+        self.scheduler.next_budget()
+
+    def speed_toggle(self):
+        self.scheduler.next_mode()
+        self.info_bar.assign_button(
+            15,
+            self.scheduler.label,
+            self.speed_toggle
+        )
+
+    def sun_toggle(self):
+        self.world.sun_toggle()
+        self.toggle_buttons()
+
+    def entropy_toggle(self):
+        self.world.entropy_toggle()
+        self.toggle_buttons()
+
+    def geyser_toggle(self):
+        self.world.geyser_toggle()
+        self.toggle_buttons()
+
+    def rain_toggle(self):
+        self.world.rain_toggle()
+        self.toggle_buttons()
+
+    def add_geysers(self):
+        self.clear_file_buttons()
+        self.world.add_geysers()
+
+    def add_life(self):
+        self.clear_file_buttons()
+        self.world.add_life()
+
+    def save_sample(self):
+        # a dead cell waits in the pool with its id and without a genome,
+        # or its instance has been reused for a new entity
+        entity = self.focus_entity
+        if self.world.entities.get(self.focus_id) is not entity \
+                or entity.inactive:
+            return
+        self.world.save_sample(entity)
+
+    def save_world(self):
+        self.world.save_snapshot()
+
+    def next_autosave(self, ticks: int):
+        if not self.autosave:
+            return None
+        return (ticks // self.autosave + 1) * self.autosave
+
+    def file_up(self):
+        if self.file_index == 0:
+            return
+        self.file_index -= 1
+        self.info_bar.print_text(4, self.files[self.file_index].name)
+
+    def file_down(self):
+        if self.file_index == len(self.files) - 1:
+            return
+        self.file_index += 1
+        self.info_bar.print_text(4, self.files[self.file_index].name)
+
+    def load_sample(self):
+        try:
+            self.world.load_sample(
+                self.files[self.file_index],
+                self.focus_coord
+            )
+        except:
+            pass
+        self.clear_file_buttons()
+
+    def load_sample_init(self):
+        self.file_list("sample-", "Load sample", self.load_sample)
+
+    def file_list(self, start, button_text, proc):
+        self.files = []
+        self.file_index = 0
+        for file in Path().iterdir():
+            if file.is_file() and file.name.startswith(start):
+                self.files.append(file)
+        self.files.sort()
+        if not self.files:
+            self.info_bar.print_text(4, "No save files found")
+            return
+        self.clear_file_buttons()
+        self.info_bar.assign_button(13, chr(708), self.file_up)
+        self.info_bar.assign_button(14, chr(709), self.file_down)
+        self.info_bar.assign_button(12, button_text, proc)
+        self.info_bar.print_text(4, self.files[self.file_index].name)
+
+    def clear_file_buttons(self):
+        self.info_bar.assign_button(12, "", None)
+        self.info_bar.assign_button(13, "", None)
+        self.info_bar.assign_button(14, "", None)
+        self.info_bar.print_text(4, None)
+
+    def load_world_init(self):
+        self.file_list("world-", "Load world", self.load_world)
+
+    def load_world(self):
+        try:
+            self.world.load_world(self.files[self.file_index])
+        except SnapshotError as error:
+            self.clear_file_buttons()
+            self.info_bar.print_text(4, str(error))
+            return
+        self.toggle_buttons()
+        self.clear_file_buttons()
+
+    def print_totals(self):
+        world = self.world
+        self.info_bar.print_text(
+            0,
+            f"Total objects: "
+            f"{world.total_life_cells + world.total_nolife_objects}, "
+            f"tick: {world.ticks}, "
+            f"ticks/s: {self.scheduler.tick_rate:.1f}, "
+            f"frame budget: {self.scheduler.budget_label}"
+        )
+        stats = world.stats
+        self.info_bar.print_text(
+            2,
+            f"Total life cells: {world.total_life_cells}, "
+            f"genomes: {stats.distinct_genomes}, "
+            f"born: {stats.births}, died: {stats.deaths}"
+        )
+        self.info_bar.print_text(
+            3,
+            f"No life objects: {world.total_nolife_objects}, "
+            f"energy: {stats.energy}"
+        )
+
+    def mouse_handler(self, mouse_pressed):
+        world = self.world
+        x, y = pygame.mouse.get_pos()
+        x //= self.scale
+        y //= self.scale
+        entity = world.who_is_there((x, y))
+        if entity is None:
+            self.info_bar.print_text(1, None)
+        else:
+            self.info_bar.print_text(1, str(entity))
+
+        if pygame.mouse.get_pressed()[0] and not mouse_pressed:
+            if entity is not None:
+                entity.print_info()
+                if entity.name == "Cell":
+                    self.focus_entity = entity
+                    self.focus_id = entity.id
+                    self.clear_file_buttons()
+                    self.info_bar.assign_button(
+                        12,
+                        "Save sample",
+                        self.save_sample
+                    )
+            else:
+                if world.in_bounds((x, y)):
+                    self.focus_coord = (x, y)
+                    self.load_sample_init()
+
+            return True
+        return pygame.mouse.get_pressed()[0] and mouse_pressed
+
+    def loop(self):
+
+        running = True
+
+        mouse_pressed = False
+
+        while running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                    self.profile_toggle()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_b:
+                    self.budget_toggle()
+
+            run = profiler.run
+            run("Gui.info_bar", self.info_bar)
+
+            # pausing and stepping take effect between ticks, a tick in
+            # progress is finished first
+            in_tick = self.world.in_tick
+            if self.go_life or in_tick:
+                self.scheduler.run_frame(
+                    self.world,
+                    None if self.go_life and not self.step_by_step else 1
+                )
+                self.print_totals()
+                in_tick = self.world.in_tick
+
+            if not in_tick:
+                self.world.purge()
+                if self.autosave and self.world.ticks >= self.autosave_tick:
+                    self.save_world()
+                    self.autosave_tick = self.next_autosave(self.world.ticks)
+
+            if not self.go_life:
+                mouse_pressed = run(
+                    "Gui.mouse",
+                    self.mouse_handler,
+                    mouse_pressed
+                )
+
+            if self.step_by_step and not in_tick:
+                self.go_life = False
+                self.step_by_step = False
+
+            if profiler.enabled:
+                self.info_bar.overlay_set(profiler.summary())
+                self.renderer.repaint = True
+            run("Gui.render", self.renderer.flush)
+            self.info_bar.draw_overlay()
+            run("Gui.flip", pygame.display.flip)
+            self.scheduler.wait()
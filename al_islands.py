@@ -0,0 +1,156 @@
+from multiprocessing import get_context
+from time import perf_counter
+import numpy as np
+from al_cell import Cell
+from al_world import build_world
+
+
+def take_migrants(world, count: int):
+    # remove up to count random cells, they leave as (genome, color, energy)
+    cells = list(world.by_name["Cell"].values())
+    migrants = []
+    randint = world.rng.randint
+    while cells and len(migrants) < count:
+        position = randint(0, len(cells) - 1)
+        cells[position], cells[-1] = cells[-1], cells[position]
+        cell = cells.pop()
+        migrants.append((cell.genome, cell.color, cell.energy))
+        world.remove_entity(cell)
+    world.purge()
+    return migrants
+
+
+def add_migrants(world, migrants: list, attempts: int = 100):
+    # land every migrant on a random free position, one that finds none
+    # in the given attempts is lost
+    randint = world.rng.randint
+    max_x, max_y = world.max_coord
+    landed = 0
+    for genome, color, energy in migrants:
+        for _ in range(attempts):
+            coord = (randint(0, max_x), randint(0, max_y))
+            if world.is_free(coord):
+                world.add_entity(
+                    world.pool.new(
+                        Cell,
+                        world,
+                        world.get_id(),
+                        coord,
+                        tuple(color),
+                        genome,
+                        energy,
+                        randint(0, 7)
+                    )
+                )
+                landed += 1
+                break
+    return landed
+
+
+def island_summary(world, seconds: float):
+    summary = world.stats.summary()
+    summary["ticks"] = world.ticks
+    summary["seconds"] = round(seconds, 6)
+    return summary
+
+
+def island_worker(conn, settings: dict, seed: int):
+    # ("run", ticks, count) answers with the summary after ticks and count
+    # emigrants, ("land", migrants) with the number of migrants landed,
+    # ("save", path) with the snapshot path, None ends the worker
+    world = build_world(settings, seed)
+    seconds = 0.0
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        if message[0] == "save":
+            conn.send(str(world.save_snapshot(message[1])))
+            continue
+        if message[0] == "land":
+            conn.send(add_migrants(world, message[1]))
+            continue
+        _, ticks, count = message
+        start = perf_counter()
+        world.run(ticks)
+        seconds += perf_counter() - start
+        # the summary is the island's own, before anyone leaves
+        summary = island_summary(world, seconds)
+        migrants = take_migrants(world, count)
+        summary["emigrants"] = len(migrants)
+        conn.send((summary, migrants))
+    conn.close()
+
+
+class IslandRunner():
+    # Island model: independent headless worlds, one process each, with
+    # their own settings (see al_world.build_world) and seed. Every epoch
+    # all islands run in parallel for a number of ticks, then a few random
+    # cells of every island migrate to the next island of the ring. The
+    # islands only wait for each other at migrations, so throughput grows
+    # with the cores as long as there is one for every island.
+    def __init__(
+            self,
+            islands: list,
+            seed: int | None = None,
+            migrants: int = 5
+    ):
+        self.migrants = migrants
+        seeds = np.random.SeedSequence(seed).spawn(len(islands))
+        self.seeds = [
+            int(child.generate_state(1, np.uint64)[0]) for child in seeds
+        ]
+        self.settings = [dict(settings) for settings in islands]
+        self.ticks = 0
+        self.summaries = [None] * len(islands)
+        self.landed = 0
+
+        context = get_context("spawn")
+        self.connections = []
+        self.processes = []
+        for settings, island_seed in zip(self.settings, self.seeds):
+            conn, worker_conn = context.Pipe()
+            process = context.Process(
+                target=island_worker,
+                args=(worker_conn, settings, island_seed),
+                daemon=True
+            )
+            process.start()
+            self.connections.append(conn)
+            self.processes.append(process)
+
+    def epoch(self, ticks: int):
+        for conn in self.connections:
+            conn.send(("run", ticks, self.migrants))
+        replies = [conn.recv() for conn in self.connections]
+        self.summaries = [summary for summary, _ in replies]
+        # island n sends its emigrants to island n + 1
+        emigrants = [migrants for _, migrants in replies]
+        for conn, migrants in zip(
+                self.connections, emigrants[-1:] + emigrants[:-1]
+        ):
+            conn.send(("land", migrants))
+        self.landed += sum(conn.recv() for conn in self.connections)
+        self.ticks += ticks
+        return self.summaries
+
+    def save(self, paths: list):
+        for conn, path in zip(self.connections, paths):
+            conn.send(("save", path))
+        return [conn.recv() for conn in self.connections]
+
+    def close(self):
+        for conn in self.connections:
+            conn.send(None)
+        for process in self.processes:
+            process.join()
+        for conn in self.connections:
+            conn.close()
+        self.connections = []
+        self.processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
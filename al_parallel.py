@@ -0,0 +1,383 @@
+from multiprocessing import Pipe, Process
+from multiprocessing.shared_memory import SharedMemory
+import os
+import numpy as np
+from al_entities import Entity
+from al_batch import BatchEngine, GENOME_LENGTH
+from al_grid import Grid, EMPTY, ENERGY, CELL, NO_ID
+
+
+class Planes():
+    # Per grid position state of the whole world in one shared memory block.
+    # Cells are stored where they stand, so a cell crossing a stripe border
+    # only changes hands by being written to a position of the other stripe.
+    layout = (
+        ("types", np.uint8, ()),
+        ("energy_at", np.int64, ()),
+        ("genome", np.uint8, (GENOME_LENGTH,)),
+        ("color", np.int16, (3,)),
+        ("energy", np.int64, ()),
+        ("ttl", np.int64, ()),
+        ("orientation", np.uint8, ()),
+        ("start", np.uint8, ()),
+        ("counter", np.uint8, ()),
+        ("criteria", np.uint8, ()),
+        ("stamp", np.int64, ()),
+    )
+
+    def __init__(self, length: int, name: str | None = None):
+        self.length = length
+        size = sum(
+            length * np.dtype(dtype).itemsize * int(np.prod(shape))
+            for _, dtype, shape in self.layout
+        )
+        self.owner = name is None
+        if self.owner:
+            self.shm = SharedMemory(create=True, size=size)
+        else:
+            self.shm = SharedMemory(name=name)
+        self.name = self.shm.name
+
+        offset = 0
+        for field, dtype, shape in self.layout:
+            array = np.ndarray(
+                (length,) + shape,
+                dtype=dtype,
+                buffer=self.shm.buf,
+                offset=offset
+            )
+            setattr(self, field, array)
+            offset += array.nbytes
+
+    def close(self):
+        for field, _, _ in self.layout:
+            setattr(self, field, None)
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class Settings():
+    # the world switches a worker needs, sent with every tick
+    def __init__(self):
+        self.sun = False
+        self.sun_level = 1
+        self.entropy = False
+        self.geyser = False
+
+    def update(self, settings: tuple):
+        self.sun, self.sun_level, self.entropy, self.geyser = settings
+
+
+class StripeEngine(BatchEngine):
+    # BatchEngine over the rows [top, bottom) of the world plus one halo row
+    # above and below. Cells in the halo rows belong to the neighbouring
+    # stripes, they are loaded so they can be seen, eaten or fed, but they
+    # are not stepped.
+    def __init__(
+            self,
+            planes: Planes,
+            size: tuple,
+            rows: tuple,
+            world=None,
+            seed=None,
+            geysers=None,
+            geyser_prod=None
+    ):
+        width, _ = size
+        top, bottom = rows
+        stride = width + 2
+        self.planes = planes
+        self.base = top * stride
+        end = (bottom + 2) * stride
+        grid = Grid(
+            (width, bottom - top),
+            Entity.directions,
+            types=planes.types[self.base:end]
+        )
+        super().__init__(
+            Settings() if world is None else world,
+            seed,
+            grid,
+            planes.energy_at[self.base:end],
+            load=False
+        )
+        self.region = (stride, (bottom - top + 1) * stride)
+        if geysers is not None:
+            self.geysers = np.asarray(geysers, dtype=np.int64) - self.base
+            self.geyser_prod = np.asarray(geyser_prod, dtype=np.int64)
+        self.tick_stamp = -1
+        self.gathered = 0
+        self.gathered_stamp = None
+        self.gathered_halo = None
+
+    def gather(self, tick: int = -1):
+        planes = self.planes
+        self.alive[:self.size] = False
+        self.size = 0
+        self.grid.ids[:] = NO_ID
+        self.tick_stamp = tick
+
+        local = np.nonzero(self.grid.types == CELL)[0]
+        at = local + self.base
+        slots = self.add_cells(
+            local,
+            planes.genome[at],
+            planes.color[at],
+            planes.orientation[at],
+            planes.energy[at]
+        )
+        self.start[slots] = planes.start[at]
+        self.ttl[slots] = planes.ttl[at]
+        self.counter[slots] = planes.counter[at]
+        self.criteria[slots] = planes.criteria[at]
+
+        low, high = self.region
+        self.gathered = len(slots)
+        self.gathered_stamp = planes.stamp[at]
+        self.gathered_halo = (local < low) | (local >= high)
+
+    def active_slots(self):
+        slots = np.arange(self.gathered)
+        active = (
+            self.alive[:self.gathered]
+            & ~self.gathered_halo
+            & (self.gathered_stamp != self.tick_stamp)
+        )
+        return slots[active]
+
+    def scatter(self):
+        planes = self.planes
+        slots = np.nonzero(self.alive[:self.size])[0]
+        at = self.index[slots] + self.base
+        planes.genome[at] = self.genome[slots]
+        planes.color[at] = self.color[slots]
+        planes.energy[at] = self.energy[slots]
+        planes.ttl[at] = self.ttl[slots]
+        planes.orientation[at] = self.orientation[slots]
+        planes.start[at] = self.start[slots]
+        planes.counter[at] = self.counter[slots]
+        planes.criteria[at] = self.criteria[slots]
+
+        # halo cells keep their stamp, everything this stripe stepped or
+        # gave birth to is marked as done for the tick
+        stamp = np.full(len(slots), self.tick_stamp, dtype=np.int64)
+        old = slots < self.gathered
+        keep = np.zeros(len(slots), dtype=bool)
+        keep[old] = self.gathered_halo[slots[old]]
+        stamp[keep] = self.gathered_stamp[slots[keep]]
+        planes.stamp[at] = stamp
+
+    def step(self, tick: int):
+        self.gather(tick)
+        self.step_geysers()
+        self.step_energy()
+        self.step_cells()
+        self.scatter()
+        return (self.total_life_cells, self.total_nolife_objects)
+
+
+def stripe_worker(conn, name, size, stripes):
+    # stripes holds (number, rows, seed, geysers, geyser_prod) of every
+    # stripe of the worker, a tick message steps those of one phase
+    width, height = size
+    planes = Planes((width + 2) * (height + 2), name)
+    engines = [
+        (
+            number % 2,
+            StripeEngine(
+                planes,
+                size,
+                rows,
+                seed=seed,
+                geysers=geysers,
+                geyser_prod=geyser_prod
+            )
+        )
+        for number, rows, seed, geysers, geyser_prod in stripes
+    ]
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        tick, settings, phase = message
+        life_cells = 0
+        nolife_objects = 0
+        for parity, engine in engines:
+            if parity != phase:
+                continue
+            engine.world.update(settings)
+            life, nolife = engine.step(tick)
+            life_cells += life
+            nolife_objects += nolife
+        conn.send((life_cells, nolife_objects))
+    del engines
+    planes.close()
+    conn.close()
+
+
+class TiledEngine():
+    # Steps a world cut into horizontal stripes on worker processes.
+    #
+    # The world state lives in shared memory (see Planes). Every tick runs
+    # in two phases: first all even stripes step in parallel, then all odd
+    # ones. There are two stripes per worker and every worker holds one
+    # even and one odd stripe, so all workers are busy in both phases. A
+    # stripe reads and writes only its own rows and the halo row of each
+    # neighbour, and stripes are at least two rows high, so stripes of
+    # the same phase never touch the same position. Cells moving, breeding,
+    # feeding or dumping energy over a stripe border simply land in the halo
+    # row and are picked up by the owning stripe in the next phase; a per
+    # position tick stamp keeps them from acting twice in one tick.
+    def __init__(
+            self,
+            world,
+            workers: int | None = None,
+            seed: int | None = None
+    ):
+        self.world = world
+        width, height = world.size
+        if workers is None:
+            workers = os.cpu_count() or 1
+        stripes = max(1, min(2 * workers, height // 2))
+        workers = -(-stripes // 2)
+
+        if seed is None:
+            seeds = world.rng.spawn(stripes + 1)
+        else:
+            seeds = np.random.SeedSequence(seed).spawn(stripes + 1)
+        self.rng = np.random.default_rng(seeds[-1])
+
+        engine = BatchEngine(world, seeds[-1])
+        self.planes = Planes(len(engine.grid.types))
+        self.stride = width + 2
+        self.planes.types[:] = engine.grid.types
+        self.planes.energy_at[:] = engine.energy_at
+        self.planes.stamp[:] = -1
+        slots = np.nonzero(engine.alive[:engine.size])[0]
+        at = engine.index[slots]
+        for field in (
+            "genome", "color", "energy", "ttl", "orientation", "start",
+            "counter", "criteria"
+        ):
+            getattr(self.planes, field)[at] = getattr(engine, field)[slots]
+        self.geysers = engine.geysers
+        self.geyser_prod = engine.geyser_prod
+
+        bounds = np.linspace(0, height, stripes + 1).astype(int).tolist()
+        self.rows = list(zip(bounds[:-1], bounds[1:]))
+
+        self.total_life_cells = 0
+        self.total_nolife_objects = 0
+        self.ticks = 0
+
+        # stripes 2n and 2n + 1 go to worker n
+        assigned = [[] for _ in range(workers)]
+        for n, (top, bottom) in enumerate(self.rows):
+            # a geyser belongs to the stripe holding its row
+            own = (self.geysers >= (top + 1) * self.stride) \
+                & (self.geysers < (bottom + 1) * self.stride)
+            assigned[n // 2].append(
+                (
+                    n,
+                    (top, bottom),
+                    seeds[n],
+                    self.geysers[own],
+                    self.geyser_prod[own]
+                )
+            )
+
+        self.connections = []
+        self.processes = []
+        for stripes in assigned:
+            conn, worker_conn = Pipe()
+            process = Process(
+                target=stripe_worker,
+                args=(worker_conn, self.planes.name, world.size, stripes),
+                daemon=True
+            )
+            process.start()
+            self.connections.append(conn)
+            self.processes.append(process)
+
+    def rainy(self, drop_energy: int = 10000):
+        max_x, max_y = self.world.max_coord
+        x = int(self.rng.integers(0, max_x, endpoint=True))
+        y = int(self.rng.integers(0, max_y, endpoint=True))
+        index = (y + 1) * self.stride + x + 1
+        if self.planes.types[index] == EMPTY:
+            self.planes.types[index] = ENERGY
+            self.planes.energy_at[index] = drop_energy
+
+    def tick(self):
+        # a failed worker would leave the others waiting and the shared
+        # memory behind, everything is shut down instead
+        try:
+            self.step()
+        except BaseException:
+            self.close()
+            raise
+
+    def step(self):
+        world = self.world
+        if world.rain:
+            self.rainy(world.rain_energy)
+        settings = (world.sun, world.sun_level, world.entropy, world.geyser)
+
+        life_cells = 0
+        nolife_objects = 0
+        for phase in (0, 1):
+            for conn in self.connections:
+                conn.send((self.ticks, settings, phase))
+            for conn in self.connections:
+                life, nolife = conn.recv()
+                life_cells += life
+                nolife_objects += nolife
+
+        self.total_life_cells = life_cells
+        self.total_nolife_objects = nolife_objects
+        self.ticks += 1
+
+    def run(self, ticks: int):
+        for _ in range(ticks):
+            self.tick()
+
+    def store(self):
+        # write the shared state back into the object world
+        _, height = self.world.size
+        engine = StripeEngine(
+            self.planes,
+            self.world.size,
+            (0, height),
+            self.world,
+            geysers=self.geysers,
+            geyser_prod=self.geyser_prod
+        )
+        engine.gather()
+        engine.store()
+
+    def close(self):
+        # safe to call again and with workers that already died
+        for conn in self.connections:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+        for process in self.processes:
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        for conn in self.connections:
+            conn.close()
+        self.connections = []
+        self.processes = []
+        if self.planes is not None:
+            self.planes.close()
+            self.planes = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
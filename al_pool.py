@@ -0,0 +1,40 @@
+class EntityPool():
+    # Free lists of retired entities. new() resets a retired instance in
+    # place by running its __init__ again instead of allocating a new one,
+    # so worlds where drops and cells come and go every tick keep reusing
+    # the same objects. Entities are released once they have left the world
+    # for good, see World.purge.
+    def __init__(self, classes: tuple = (), limit: int = 1 << 16):
+        self.free = {cls: [] for cls in classes}
+        self.limit = limit
+        self.hits = 0
+        self.misses = 0
+
+    def new(self, cls, *args, **kwargs):
+        free = self.free.get(cls)
+        if free:
+            self.hits += 1
+            entity = free.pop()
+            entity.__init__(*args, **kwargs)
+            return entity
+        self.misses += 1
+        return cls(*args, **kwargs)
+
+    def release(self, entity):
+        free = self.free.get(type(entity))
+        if free is not None and len(free) < self.limit:
+            entity.retire()
+            free.append(entity)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "free": {cls.__name__: len(free) for cls, free in self.free.items()},
+        }
@@ -0,0 +1,126 @@
+import json
+from time import perf_counter
+
+
+class Profiler():
+    # Runtime switchable counters and timers.
+    #
+    # Hot methods are registered with instrument() and only replaced by
+    # timing wrappers while profiling is on, so a disabled profiler costs
+    # nothing on the per-entity path. Coarse phases go through run(), which
+    # is a plain call when profiling is off.
+    def __init__(self):
+        self.enabled = False
+        self.counts = {}
+        self.times = {}
+        self.methods = []
+        self.listeners = []
+        self.started = None
+
+        self.dump_path = None
+        self.dump_interval = 0
+
+    def add(self, name: str, elapsed: float):
+        self.counts[name] = self.counts.get(name, 0) + 1
+        self.times[name] = self.times.get(name, 0.0) + elapsed
+
+    def wrap(self, name: str, func):
+        add = self.add
+
+        def inner(*args, **kwargs):
+            start = perf_counter()
+            result = func(*args, **kwargs)
+            add(name, perf_counter() - start)
+            return result
+
+        return inner
+
+    def instrument(self, owner, attribute: str, name: str):
+        self.methods.append((owner, attribute, name, getattr(owner, attribute)))
+        if self.enabled:
+            setattr(owner, attribute, self.wrap(name, getattr(owner, attribute)))
+
+    def on_toggle(self, callback):
+        # callback(enabled) for instrumentation the profiler can not swap
+        # by itself, e.g. command tables
+        self.listeners.append(callback)
+        if self.enabled:
+            callback(True)
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.started = perf_counter()
+        for owner, attribute, name, func in self.methods:
+            setattr(owner, attribute, self.wrap(name, func))
+        for callback in self.listeners:
+            callback(True)
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for owner, attribute, _, func in self.methods:
+            setattr(owner, attribute, func)
+        for callback in self.listeners:
+            callback(False)
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def reset(self):
+        self.counts = {}
+        self.times = {}
+        self.started = perf_counter() if self.enabled else None
+
+    def run(self, name: str, func, *args):
+        if not self.enabled:
+            return func(*args)
+        start = perf_counter()
+        result = func(*args)
+        self.add(name, perf_counter() - start)
+        return result
+
+    def report(self):
+        return [
+            {
+                "name": name,
+                "count": self.counts[name],
+                "seconds": self.times[name],
+            }
+            for name in sorted(self.times, key=self.times.get, reverse=True)
+        ]
+
+    def summary(self, lines: int = 10):
+        return [
+            f"{entry['seconds']: >8.3f}s {entry['count']: >10} "
+            f"{entry['name']}"
+            for entry in self.report()[:lines]
+        ]
+
+    def set_dump(self, path, interval: int):
+        # dump the report to path every interval ticks, 0 switches it off
+        self.dump_path = path
+        self.dump_interval = interval
+
+    def dump(self, path=None, ticks: int | None = None):
+        path = self.dump_path if path is None else path
+        elapsed = perf_counter() - self.started if self.started else 0.0
+        with open(path, mode="w", encoding="utf-8") as fh:
+            json.dump(
+                {"ticks": ticks, "seconds": elapsed, "entries": self.report()},
+                fh,
+                indent=4
+            )
+
+    def tick(self, ticks: int):
+        if self.dump_interval and self.dump_path \
+                and ticks % self.dump_interval == 0:
+            self.dump(ticks=ticks)
+
+
+profiler = Profiler()
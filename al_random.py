@@ -0,0 +1,81 @@
+import numpy as np
+
+
+class RandomStream():
+    # Per world source of randomness. Uniform values are generated by NumPy
+    # in batches and handed out one by one, which is cheaper than a call
+    # into the random module for every draw. Everything is derived from one
+    # explicit seed, so a run can be repeated exactly.
+    def __init__(self, seed: int | None = None, batch: int = 1 << 16):
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.seed = self.seed_sequence.entropy
+        self.generator = np.random.default_rng(self.seed_sequence)
+        self.batch = batch
+        self.batch_state = None
+        self.values = None
+        self.position = 0
+        self.refill()
+
+    def refill(self):
+        self.batch_state = self.generator.bit_generator.state
+        self.values = self.generator.random(self.batch).tolist()
+        self.position = 0
+
+    def random(self):
+        position = self.position
+        if position == self.batch:
+            self.refill()
+            position = 0
+        self.position = position + 1
+        return self.values[position]
+
+    def randint(self, a: int, b: int):
+        # a <= n <= b, like random.randint
+        position = self.position
+        if position == self.batch:
+            self.refill()
+            position = 0
+        self.position = position + 1
+        return a + int(self.values[position] * (b - a + 1))
+
+    def randints(self, a: int, b: int, count: int):
+        # count draws like randint, as an array
+        values = []
+        while count:
+            if self.position == self.batch:
+                self.refill()
+            take = min(count, self.batch - self.position)
+            values.extend(self.values[self.position:self.position + take])
+            self.position += take
+            count -= take
+        return a + (np.array(values) * (b - a + 1)).astype(np.int64)
+
+    def shuffle(self, items: list):
+        randint = self.randint
+        for i in range(len(items) - 1, 0, -1):
+            j = randint(0, i)
+            items[i], items[j] = items[j], items[i]
+
+    def spawn(self, count: int):
+        # independent child seeds, e.g. for array engines or worker processes
+        return self.seed_sequence.spawn(count)
+
+    def get_state(self):
+        return {
+            "seed": self.seed,
+            "batch": self.batch,
+            "state": self.batch_state,
+            "position": self.position,
+            "spawned": self.seed_sequence.n_children_spawned,
+        }
+
+    def set_state(self, state: dict):
+        self.seed_sequence = np.random.SeedSequence(
+            state["seed"],
+            n_children_spawned=state["spawned"]
+        )
+        self.seed = state["seed"]
+        self.batch = state["batch"]
+        self.generator.bit_generator.state = state["state"]
+        self.refill()
+        self.position = state["position"]
@@ -0,0 +1,94 @@
+import numpy as np
+import pygame
+
+
+class Renderer():
+    # Keeps a world sized pixel buffer. Drawing calls only record the new
+    # color of a pixel, flush() writes all of them into the buffer with one
+    # array assignment and blits the scaled buffer to the screen once.
+    def __init__(
+            self,
+            screen,
+            scale: int = 1,
+            bg_color: tuple | int = 0x000000
+    ):
+        self.screen = screen
+        self.scale = scale
+        self.bg_color = bg_color
+        self.buffer = None
+        self.pixels = None
+        self.dirty = {}
+        self.mapped_colors = {}
+        self.repaint = True
+
+    def attach(self, world):
+        # paint whatever the world already holds, so a display can be
+        # attached to a simulation that has been running headless
+        self.buffer = pygame.Surface(world.size).convert(self.screen)
+        self.pixels = np.full(
+            world.size,
+            self.map_color(self.bg_color),
+            dtype=np.uint32
+        )
+        self.dirty = {}
+        for entity in world.entities.values():
+            if not entity.inactive:
+                self.draw_pixel(entity.coord, entity.color)
+        self.draw_mask(world.terrain(), world.terrain_color)
+        if world.field is not None:
+            self.draw_mask(world.field.mask(), world.field.color)
+        self.repaint = True
+
+    def map_color(self, color: tuple | int):
+        mapped = self.mapped_colors.get(color)
+        if mapped is None:
+            rgb = color
+            if isinstance(color, int):
+                rgb = ((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF)
+            mapped = self.buffer.map_rgb(rgb)
+            self.mapped_colors[color] = mapped
+        return mapped
+
+    def draw_pixel(
+            self,
+            coord: tuple,
+            color: tuple | int = 0xFFFFFF
+    ):
+        self.dirty[coord] = color
+
+    def erase_pixel(self, coord: tuple):
+        self.dirty[coord] = self.bg_color
+
+    def draw_mask(self, mask, color: tuple | int = 0xFFFFFF):
+        # bulk drawing of a (height, width) mask, e.g. the terrain
+        self.update_pixels()
+        self.pixels[mask.T] = self.map_color(color)
+        self.repaint = True
+
+    def erase_mask(self, mask):
+        self.draw_mask(mask, self.bg_color)
+
+    def update_pixels(self):
+        if not self.dirty:
+            return False
+        map_color = self.map_color
+        xs, ys = zip(*self.dirty)
+        colors = [map_color(color) for color in self.dirty.values()]
+        self.pixels[xs, ys] = colors
+        self.dirty = {}
+        return True
+
+    def flush(self):
+        if not self.update_pixels() and not self.repaint:
+            return
+        self.repaint = False
+
+        pygame.surfarray.blit_array(self.buffer, self.pixels)
+        width, height = self.buffer.get_size()
+        self.screen.blit(
+            pygame.transform.scale(
+                self.buffer,
+                (width * self.scale, height * self.scale)
+            ),
+            (0, 0)
+        )
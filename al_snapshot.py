@@ -0,0 +1,124 @@
+import json
+import struct
+import zlib
+import numpy as np
+
+
+# Binary world snapshot.
+#
+#   magic (8 bytes) | version, header length (2 x uint32, little endian) |
+#   JSON header | padding | array blobs, each aligned to ALIGN bytes
+#
+# The header holds the world settings and, for every array, its dtype,
+# shape, offset from the first blob and whether it is zlib compressed.
+# Uncompressed arrays are opened as read-only memory maps, so a snapshot is
+# not read into memory before its columns are actually used.
+
+MAGIC = b"ALWORLD\0"
+VERSION = 2
+ALIGN = 64
+PREFIX = struct.Struct("<II")
+SUFFIX = ".alw"
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def align(offset: int):
+    return -(-offset // ALIGN) * ALIGN
+
+
+def write(path, settings: dict, arrays: dict, compress: bool = False):
+    entries = {}
+    blobs = []
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        data = array.tobytes()
+        if compress:
+            data = zlib.compress(data, 1)
+        entries[name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+            "length": len(data),
+            "compressed": compress,
+        }
+        blobs.append(data)
+        offset = align(offset + len(data))
+
+    header = {"version": VERSION, "settings": settings, "arrays": entries}
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = align(len(MAGIC) + PREFIX.size + len(header_bytes))
+
+    with open(path, mode="wb") as fh:
+        fh.write(MAGIC)
+        fh.write(PREFIX.pack(VERSION, len(header_bytes)))
+        fh.write(header_bytes)
+        for entry, data in zip(entries.values(), blobs):
+            fh.write(b"\0" * (data_start + entry["offset"] - fh.tell()))
+            fh.write(data)
+    return path
+
+
+class Snapshot():
+    def __init__(self, path, mmap: bool = True):
+        self.path = path
+        with open(path, mode="rb") as fh:
+            if fh.read(len(MAGIC)) != MAGIC:
+                raise SnapshotError(f"{path} is not a world snapshot")
+            version, header_length = PREFIX.unpack(fh.read(PREFIX.size))
+            if version > VERSION:
+                raise SnapshotError(
+                    f"{path} has snapshot version {version}, "
+                    f"only up to {VERSION} is supported"
+                )
+            header = json.loads(fh.read(header_length).decode("utf-8"))
+        data_start = align(len(MAGIC) + PREFIX.size + header_length)
+        self.version = version
+        self.settings = header["settings"]
+        self.entries = header["arrays"]
+        for entry in self.entries.values():
+            entry["offset"] += data_start
+        self.mmap = mmap
+        self.arrays = {}
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def __getitem__(self, name):
+        array = self.arrays.get(name)
+        if array is not None:
+            return array
+        entry = self.entries[name]
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        if entry["compressed"] or not self.mmap:
+            with open(self.path, mode="rb") as fh:
+                fh.seek(entry["offset"])
+                data = fh.read(entry["length"])
+            if entry["compressed"]:
+                data = zlib.decompress(data)
+            array = np.frombuffer(data, dtype=dtype).reshape(shape)
+        elif entry["length"] == 0:
+            array = np.zeros(shape, dtype=dtype)
+        else:
+            array = np.memmap(
+                self.path,
+                dtype=dtype,
+                mode="r",
+                offset=entry["offset"],
+                shape=shape
+            )
+        self.arrays[name] = array
+        return array
+
+
+def read(path, mmap: bool = True):
+    return Snapshot(path, mmap)
+
+
+def is_snapshot(path):
+    with open(path, mode="rb") as fh:
+        return fh.read(len(MAGIC)) == MAGIC
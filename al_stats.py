@@ -0,0 +1,75 @@
+class Statistics():
+    # Population figures of one world, kept up to date on every add, remove
+    # and energy change instead of being counted by walking the world, so
+    # reading any of them costs the same however large the world is.
+    #
+    # gene_usage counts the command genes over all live cells, a new or
+    # mutated genome brings its own counts, see Program.commands. births and
+    # deaths are the cells added and removed during the last tick.
+    def __init__(self, genomes):
+        self.genomes = genomes
+        self.population = {}
+        self.gene_usage = [0] * 101
+        self.energy = 0
+        self.births = 0
+        self.deaths = 0
+
+    def add(self, entity):
+        name = entity.name
+        self.population[name] = self.population.get(name, 0) + 1
+        self.energy += entity.energy
+        if name == "Cell":
+            self.births += 1
+            gene_usage = self.gene_usage
+            for gene, count in entity.program.commands:
+                gene_usage[gene] += count
+
+    def remove(self, entity):
+        name = entity.name
+        self.population[name] -= 1
+        self.energy -= entity.energy
+        if name == "Cell":
+            self.deaths += 1
+            gene_usage = self.gene_usage
+            for gene, count in entity.program.commands:
+                gene_usage[gene] -= count
+
+    def add_energy(self, energy: int):
+        # energy moved into or out of an entity by another one
+        self.energy += energy
+
+    def add_free_energy(self, cells: int, energy: int):
+        # free energy kept outside of entities, see EnergyField
+        self.population["Energy"] = self.population.get("Energy", 0) + cells
+        self.energy += energy
+
+    def new_tick(self):
+        self.births = 0
+        self.deaths = 0
+
+    def reset(self):
+        self.population = {}
+        self.gene_usage = [0] * 101
+        self.energy = 0
+        self.births = 0
+        self.deaths = 0
+
+    def count(self, name: str):
+        return self.population.get(name, 0)
+
+    @property
+    def distinct_genomes(self):
+        return len(self.genomes)
+
+    def summary(self):
+        return {
+            "population": dict(self.population),
+            "distinct_genomes": self.distinct_genomes,
+            "energy": self.energy,
+            "births": self.births,
+            "deaths": self.deaths,
+            "gene_usage": {
+                gene: count
+                for gene, count in enumerate(self.gene_usage) if count
+            },
+        }
@@ -0,0 +1,43 @@
+import numpy as np
+
+
+# Static terrain masks. A mask is a (height, width) array, true where the
+# world is impassable, see World.set_terrain.
+
+
+def walls(size: tuple):
+    # a one cell wide frame around the whole world
+    width, height = size
+    mask = np.zeros((height, width), dtype=bool)
+    mask[0, :] = True
+    mask[-1, :] = True
+    mask[:, 0] = True
+    mask[:, -1] = True
+    return mask
+
+
+def from_array(array, size: tuple):
+    # any array of the world's shape, non-zero cells are terrain
+    width, height = size
+    mask = np.asarray(array) != 0
+    if mask.shape != (height, width):
+        raise ValueError(
+            f"terrain of shape {mask.shape} does not fit a "
+            f"{width}x{height} world"
+        )
+    return mask
+
+
+def from_image(path, size: tuple, threshold: int = 128):
+    # dark pixels are terrain, the image is scaled to the world size.
+    # pygame is only needed here, so headless runs without images do not
+    # import it
+    import pygame
+
+    image = pygame.image.load(path)
+    if image.get_size() != tuple(size):
+        image = pygame.transform.scale(image, size)
+    rgb = pygame.surfarray.array3d(image).astype(np.uint32)
+    luminance = (rgb[:, :, 0] * 299 + rgb[:, :, 1] * 587
+                 + rgb[:, :, 2] * 114) // 1000
+    return (luminance < threshold).T
@@ -1,96 +1,97 @@
 from datetime import datetime
+from heapq import heappop, heappush
 import json
 from pathlib import Path
-from random import randint
-import pygame
-from al_entities import Energy, Geyser
+import numpy as np
+from al_entities import Entity, Energy, Geyser
 from al_cell import Cell
-from info_bar import InfoBar
+from al_grid import Grid, TYPE_CODES, EMPTY, ROCK, NO_ID
+from al_random import RandomStream
+from al_genome import GenomePool
+from al_stats import Statistics
+from al_field import EnergyField
+from al_pool import EntityPool
+from al_profile import profiler
+import al_snapshot
+import al_terrain
+
+
+class HeadlessRenderer():
+    # renderer stub for runs without a display, every drawing call is a no-op
+    def attach(self, world):
+        pass
+
+    def draw_pixel(self, coord: tuple, color: tuple | int):
+        pass
+
+    def erase_pixel(self, coord: tuple):
+        pass
+
+    def draw_mask(self, mask, color: tuple | int):
+        pass
+
+    def erase_mask(self, mask):
+        pass
 
 
 class World():
+    terrain_color = 0xff0000
+
     def __init__(
             self,
             size: tuple = (640, 480),
-            bg_color: tuple | int = 0x000000,
             sun_level: int = 1,
-            scale: int = 1
+            renderer=None,
+            seed: int | None = None,
+            energy_field: bool = False
     ):
-
-        pygame.init()
-        logo = pygame.image.load("logo32x32.png")
-        pygame.display.set_icon(logo)
-        pygame.display.set_caption("Artificial life simulator")
-
-        self.scale = scale
-        info_bar_height = 5 * 14
-        width, height = size
-        width *= scale
-        height = height * scale + info_bar_height
-        self.screen = pygame.display.set_mode((width, height))
-        self.screen.fill(bg_color)
+        self.size = size
+        self.rng = RandomStream(seed)
         self.entities = {}
-        self.collide_list = {}
+        # live entities of every type in id order, type scoped work walks
+        # these instead of all entities, the grid is the spatial index
+        self.by_name = {"Geyser": {}, "Energy": {}, "Cell": {}}
+        # entities updated each tick, see sleep() and wake()
+        self.active = {}
+        self.woken = None
+        self.awake_flags = (False, False)
+        # retired drops and cells are reused, entity ids are not: they keep
+        # growing, the update order and snapshots rely on it
+        self.pool = EntityPool((Energy, Cell))
+        self.genomes = GenomePool()
+        self.stats = Statistics(self.genomes)
+        self.grid = Grid(size, Entity.directions)
+        # free energy as an array instead of Energy entities, see al_field
+        self.field = EnergyField(self) if energy_field else None
         self.remove_entities = []
         self.next_entity_id = 0
-        self.bg_color = bg_color
 
         self.sun_level = sun_level
-        self.sun = True
-        self.entropy = True
-        self.geyser = True
-        self.rain = True
-
-        self.go_life = False
-        self.step_by_step = False
+        self.sun = False
+        self.entropy = False
+        self.geyser = False
+        self.rain = False
+        # energy of a rain drop and of a new geyser's production per tick
+        self.rain_energy = 10000
+        self.geyser_energy = 500
 
         max_x = size[0] - 1
         max_y = size[1] - 1
         self.max_coord = (max_x, max_y)
 
-        self.total_life_cells = 0
-        self.total_nolife_objects = 0
+        self.ticks = 0
+        # entities updated per slice of a sliced tick, see tick_slice()
+        self.slice_size = 1000
+        self.slices = None
 
-        self.focus_entity = None
-        self.focus_coord = None
+        self.renderer = None
+        self.attach_renderer(renderer)
 
-        self.files = []
-        self.file_index = 0
-
-        self.pixel_surface = pygame.Surface((scale, scale))
-
-        self.info_bar = InfoBar(
-            self.screen,
-            0,
-            self.screen.get_height() - info_bar_height,
-            self.screen.get_width(),
-            info_bar_height,
-            0x808080
-        )
-        self.info_bar.assign_button(0, "Go", self.start_pause)
-        self.info_bar.assign_button(1, "Step", self.step_forward)
-        self.info_bar.assign_button(4, "Add geysers", self.add_geysers)
-        self.info_bar.assign_button(5, "Rm geysers", self.rm_geysers)
-        self.info_bar.assign_button(8, "Add life", self.add_life)
-        self.info_bar.assign_button(9, "Clear", self.rm_all)
-        self.info_bar.assign_button(10, "Seve world", self.save_world)
-        self.info_bar.assign_button(11, "Load world", self.load_world_init)
-
-        self.entropy_toggle()
-        self.sun_toggle()
-        self.geyser_toggle()
-        self.rain_toggle()
-
-    def draw_pixel(
-            self,
-            coords: tuple,
-            color: int = 0xFFFFFF
-    ):
-        x, y = coords
-        x *= self.scale
-        y *= self.scale
-        self.pixel_surface.fill(color)
-        self.screen.blit(self.pixel_surface, (x, y))
+    def attach_renderer(self, renderer=None):
+        if renderer is None:
+            renderer = HeadlessRenderer()
+        self.renderer = renderer
+        renderer.attach(self)
 
     def get_id(self):
         entity_id = self.next_entity_id
@@ -99,117 +100,202 @@ class World():
 
     def add_entity(self, new_entity):
         entity_id = new_entity.id
-        coord = new_entity.coord
-        color = new_entity.color
+        index = new_entity.index
         self.entities[entity_id] = new_entity
-        self.draw_pixel(coord, color)
-        self.collide_list[coord] = entity_id
+        self.by_name[new_entity.name][entity_id] = new_entity
+        self.active[entity_id] = new_entity
+        self.stats.add(new_entity)
+        self.renderer.draw_pixel(new_entity.coord, new_entity.color)
+        self.grid.place(index, entity_id, TYPE_CODES[new_entity.name])
 
     def remove_entity(self, entity):
-        entity_id = entity.id
-        coord = entity.coord
         entity.inactive = True
-        self.remove_entities.append(entity_id)
-        self.collide_list.pop(coord)
-        self.draw_pixel(coord, self.bg_color)
+        del self.by_name[entity.name][entity.id]
+        self.stats.remove(entity)
+        if entity.name == "Cell":
+            self.genomes.release(entity.genome_id)
+        self.remove_entities.append(entity.id)
+        self.grid.clear(entity.index)
+        self.renderer.erase_pixel(entity.coord)
+
+    def move_entity(self, entity, new_index: int):
+        new_coord = self.grid.coord(new_index)
+        self.renderer.erase_pixel(entity.coord)
+        self.renderer.draw_pixel(new_coord, entity.color)
+        self.grid.move(entity.index, new_index)
+        entity.index = new_index
+
+    def purge(self):
+        if not self.remove_entities:
+            return
+        release = self.pool.release
+        for remove_entity in self.remove_entities:
+            entity = self.entities.pop(remove_entity, None)
+            self.active.pop(remove_entity, None)
+            if entity is not None:
+                release(entity)
+        self.remove_entities = []
 
-    def who_is_there(self, coord: tuple):
-        entity_id = self.collide_list.get(coord)
-        if entity_id is None:
-            return None
-        return self.entities[entity_id]
+    def sleep(self, entity):
+        # An entity with nothing to do until something changes around it
+        # leaves the update list. Its update would be a no-op anyway, so
+        # with every wake up event in place sleeping changes nothing but
+        # the cost of a tick.
+        del self.active[entity.id]
+
+    def wake(self, entity):
+        entity_id = entity.id
+        if entity_id in self.active:
+            return
+        self.active[entity_id] = entity
+        if self.woken is not None:
+            self.woken.append(entity_id)
 
-    def start_pause(self):
-        self.go_life = not self.go_life
-        text_button = "Pause" if self.go_life else "Go"
-        self.info_bar.assign_button(0, text_button, self.start_pause)
-        if self.go_life:
-            self.info_bar.assign_button(1, "", None)
-            self.info_bar.assign_button(10, "", None)
-            self.info_bar.assign_button(11, "", None)
-            self.clear_file_buttons()
+    def wake_all(self, name: str):
+        for entity in self.by_name[name].values():
+            self.wake(entity)
 
-        else:
-            self.info_bar.assign_button(1, "Step", self.step_forward)
-            self.info_bar.assign_button(10, "Seve world", self.save_world)
-            self.info_bar.assign_button(11, "Load world", self.load_world_init)
+    def entity_at(self, index: int):
+        entity_id = self.grid.ids_view[index]
+        if entity_id < 0:
+            return None
+        return self.entities[entity_id]
 
-    def step_forward(self):
-        self.clear_file_buttons()
-        self.step_by_step = True
-        self.go_life = True
+    def who_is_there(self, coord: tuple):
+        if not self.grid.in_bounds(coord):
+            return None
+        return self.entity_at(self.grid.index(coord))
+
+    def in_bounds(self, coord: tuple):
+        return self.grid.in_bounds(coord)
+
+    def is_free(self, coord: tuple):
+        # neither an entity nor terrain at coord
+        return self.grid.types_view[self.grid.index(coord)] == EMPTY
+
+    def terrain(self):
+        return self.grid.inner(self.grid.types) == ROCK
+
+    def set_terrain(self, mask):
+        # Replace the static terrain layer by a (height, width) mask, see
+        # al_terrain. Terrain is a grid type without an entity, so it is
+        # never updated and costs nothing per tick. Entities standing where
+        # terrain appears are removed.
+        mask = al_terrain.from_array(mask, self.size)
+        types = self.grid.inner(self.grid.types)
+        ids = self.grid.inner(self.grid.ids)
+        old = types == ROCK
+        for entity_id in ids[mask & (ids != NO_ID)].tolist():
+            self.remove_entity(self.entities[entity_id])
+        types[old & ~mask] = EMPTY
+        types[mask] = ROCK
+        self.renderer.erase_mask(old & ~mask)
+        self.renderer.draw_mask(mask & ~old, self.terrain_color)
 
     def sun_toggle(self):
         self.sun = not self.sun
-        msg = "Off sun" if self.sun else "On sun"
-        self.info_bar.assign_button(3, msg, self.sun_toggle)
 
     def entropy_toggle(self):
         self.entropy = not self.entropy
-        msg = "Off entropy" if self.entropy else "On entropy"
-        self.info_bar.assign_button(2, msg, self.entropy_toggle)
 
     def geyser_toggle(self):
         self.geyser = not self.geyser
-        msg = "Off geysers" if self.geyser else "On geysers"
-        self.info_bar.assign_button(7, msg, self.geyser_toggle)
 
     def rain_toggle(self):
         self.rain = not self.rain
-        msg = "Off rain" if self.rain else "On rain"
-        self.info_bar.assign_button(6, msg, self.rain_toggle)
 
-    def rainy(self, drop_energy=10000):
+    def build_walls(self):
+        # rock perimeter around the whole world
+        self.set_terrain(self.terrain() | al_terrain.walls(self.size))
+
+    def rainy(self, drop_energy=None):
+        if drop_energy is None:
+            drop_energy = self.rain_energy
+        randint = self.rng.randint
         max_x, max_y = self.max_coord
         x = randint(0, max_x)
         y = randint(0, max_y)
-        if self.who_is_there((x, y)) is None:
-            energy = Energy(self, self.get_id(), (x, y), drop_energy)
-            self.add_entity(energy)
+        if self.is_free((x, y)):
+            self.drop_energy(self.grid.index((x, y)), drop_energy)
+
+    def drop_energy(self, index: int, energy: int):
+        # free energy on an empty position
+        if self.field is not None:
+            self.field.drop(index, energy)
+            return
+        self.add_entity(
+            self.pool.new(
+                Energy, self, self.get_id(), self.grid.coord(index), energy
+            )
+        )
 
-    def add_geysers(self):
-        self.clear_file_buttons()
-        i = 10
+    def add_geysers(self, count: int | None = None, attempts: int = 100):
+        # without a count 10 random positions get a geyser when free,
+        # with one count geysers are placed, each given up on only after
+        # the given attempts found no free position
+        randint = self.rng.randint
         max_x, max_y = self.max_coord
-        while i:
-            x = randint(0, max_x)
-            y = randint(0, max_y)
-            if self.who_is_there((x, y)) is None:
-                gayser = Geyser(self, self.get_id(), (x, y))
-                self.add_entity(gayser)
-            i -= 1
+        if count is None:
+            tries = [1] * 10
+        else:
+            tries = [attempts] * count
+        for i in tries:
+            while i:
+                x = randint(0, max_x)
+                y = randint(0, max_y)
+                i -= 1
+                if self.is_free((x, y)):
+                    gayser = Geyser(
+                        self, self.get_id(), (x, y), self.geyser_energy
+                    )
+                    self.add_entity(gayser)
+                    break
 
     def rm_geysers(self):
-        for entity in self.entities.values():
-            if entity.name == "Geyser":
-                self.remove_entity(entity)
+        for geyser in list(self.by_name["Geyser"].values()):
+            self.remove_entity(geyser)
 
     def rm_all(self):
-        for entity_key in sorted(self.entities.keys(), reverse=True):
-            entity = self.entities[entity_key]
-            if entity.name != "Rock":
-                entity_id = entity.id
-                coord = entity.coord
-                self.collide_list.pop(coord)
-                self.entities.pop(entity_id)
-                self.draw_pixel(coord, self.bg_color)
-        self.next_entity_id = max(self.entities.keys()) + 1
-
-    def add_life(self):
-        self.clear_file_buttons()
-        i = 1000
+        # everything but the terrain. Nothing here walks the entities, they
+        # are erased by one mask and dropped with their dicts, so clearing
+        # costs the same however many there are. They are not handed to the
+        # pool either, it refills within a few ticks.
+        self.purge()
+        # a tick in progress is dropped, it is never counted
+        self.slices = None
+        self.woken = None
+        types = self.grid.inner(self.grid.types)
+        self.renderer.erase_mask((types != EMPTY) & (types != ROCK))
+        self.entities = {}
+        self.by_name = {name: {} for name in self.by_name}
+        self.active = {}
+        if self.field is not None:
+            self.renderer.erase_mask(self.field.mask())
+            self.field.clear()
+        self.grid.clear_all(keep=(ROCK,))
+        self.genomes.clear()
+        self.stats.reset()
+        self.next_entity_id = 0
+
+    def add_life(self, count: int = 1000, mutation: int | None = None):
+        # mutation overrides the random mutation probability gene, 0..100
+        randint = self.rng.randint
+        i = count
         while i:
             max_x, max_y = self.max_coord
             x = randint(0, max_x)
             y = randint(0, max_y)
-            if self.who_is_there((x, y)) is None:
+            if self.is_free((x, y)):
                 r = randint(80, 255)
                 g = randint(80, 255)
                 b = randint(80, 255)
                 orientation = randint(0, 7)
                 genome = [randint(0, 100) for _ in range(109)]
                 genome[100] = randint(0, 99)
-                cell = Cell(
+                if mutation is not None:
+                    genome[107] = mutation
+                cell = self.pool.new(
+                    Cell,
                     self,
                     self.get_id(),
                     (x, y),
@@ -222,91 +308,63 @@ class World():
             i -= 1
 
     @staticmethod
-    def file_path(start_with):
+    def file_path(start_with, suffix=".json"):
         time_stamp = datetime.now().strftime("%Y.%m.%d-%H.%M.%S.%f")
-        return Path().joinpath(f"{start_with}-{time_stamp}.json")
+        return Path().joinpath(f"{start_with}-{time_stamp}{suffix}")
+
+    def settings(self):
+        return {
+            "sun": self.sun,
+            "sun_level": self.sun_level,
+            "entropy": self.entropy,
+            "geyser": self.geyser,
+            "rain": self.rain,
+            "rain_energy": self.rain_energy,
+            "geyser_energy": self.geyser_energy
+        }
 
-    def save_sample(self):
-        path = self.file_path("sample")
+    def apply_settings(self, world_settings: dict):
+        self.sun = world_settings["sun"]
+        self.sun_level = world_settings["sun_level"]
+        self.entropy = world_settings["entropy"]
+        self.geyser = world_settings["geyser"]
+        self.rain = world_settings["rain"]
+        # not in files saved before these were settings
+        self.rain_energy = world_settings.get("rain_energy", 10000)
+        self.geyser_energy = world_settings.get("geyser_energy", 500)
+
+    def save_sample(self, entity, path=None):
+        if path is None:
+            path = self.file_path("sample")
         save_dict = {
-            "color": self.focus_entity.color,
-            "genome": self.focus_entity.genome,
+            "color": entity.color,
+            "genome": list(entity.genome),
         }
         with open(path, mode="w", encoding="utf-8") as fh:
             json.dump(save_dict, fh)
-
-    def file_up(self):
-        if self.file_index == 0:
-            return
-        self.file_index -= 1
-        self.info_bar.print_text(4, self.files[self.file_index].name)
-
-    def file_down(self):
-        if self.file_index == len(self.files) - 1:
-            return
-        self.file_index += 1
-        self.info_bar.print_text(4, self.files[self.file_index].name)
-
-    def load_sample(self):
-        with open(self.files[self.file_index], mode="r", encoding="utf-8") as fh:
-            try:
-                load_dict = json.load(fh)
-                entity = Cell(
-                    self,
-                    self.get_id(),
-                    self.focus_coord,
-                    load_dict["color"],
-                    load_dict["genome"],
-                    None,
-                    randint(0, 7)
-                )
-                self.add_entity(entity)
-            except:
-                pass
-        self.clear_file_buttons()
-
-    def load_sample_init(self):
-        self.file_list("sample-", "Load sample", self.load_sample)
-
-    def file_list(self, start, button_text, proc):
-        self.files = []
-        self.file_index = 0
-        for file in Path().iterdir():
-            if file.is_file() and file.name.startswith(start):
-                self.files.append(file)
-        self.files.sort()
-        if not self.files:
-            self.info_bar.print_text(4, "No save files found")
-            return
-        self.clear_file_buttons()
-        self.info_bar.assign_button(13, chr(708), self.file_up)
-        self.info_bar.assign_button(14, chr(709), self.file_down)
-        self.info_bar.assign_button(12, button_text, proc)
-        self.info_bar.print_text(4, self.files[self.file_index].name)
-
-    def clear_file_buttons(self):
-        self.info_bar.assign_button(12, "", None)
-        self.info_bar.assign_button(13, "", None)
-        self.info_bar.assign_button(14, "", None)
-        self.info_bar.assign_button(15, "", None)
-        self.info_bar.print_text(4, None)
-
-    def load_world_init(self):
-        self.file_list("world-", "Load world", self.load_world)
+        return path
+
+    def load_sample(self, path, coord: tuple):
+        # the position may have been taken since it was picked
+        if not self.is_free(coord):
+            raise ValueError(f"position {coord} is not free")
+        with open(path, mode="r", encoding="utf-8") as fh:
+            load_dict = json.load(fh)
+        entity = Cell(
+            self,
+            self.get_id(),
+            coord,
+            tuple(load_dict["color"]),
+            tuple(load_dict["genome"]),
+            None,
+            self.rng.randint(0, 7)
+        )
+        self.add_entity(entity)
+        return entity
 
     def fill_the_world(self, world_list):
         self.rm_all()
-        world_settings = world_list.pop(0)
-        self.sun = not world_settings["sun"]
-        self.sun_level = world_settings["sun_level"]
-        self.entropy = not world_settings["entropy"]
-        self.geyser = not world_settings["geyser"]
-        self.rain = not world_settings["rain"]
-
-        self.entropy_toggle()
-        self.sun_toggle()
-        self.geyser_toggle()
-        self.rain_toggle()
+        self.apply_settings(world_list.pop(0))
 
         for val in world_list:
             if val["name"] == "Geyser":
@@ -316,18 +374,17 @@ class World():
                     tuple(val["coord"])
                 )
             elif val["name"] == "Energy":
-                entity = Energy(
-                    self,
-                    self.get_id(),
-                    tuple(val["coord"]),
+                self.drop_energy(
+                    self.grid.index(tuple(val["coord"])),
                     val["energy"]
                 )
+                continue
             elif val["name"] == "Cell":
                 entity = Cell(
                     self,
                     self.get_id(),
                     tuple(val["coord"]),
-                    val["color"],
+                    tuple(val["color"]),
                     tuple(int(gen) for gen in val["genome"].split(",")),
                     val["energy"],
                     val["orientation"],
@@ -335,25 +392,195 @@ class World():
                 )
             self.add_entity(entity)
 
-    def load_world(self):
-        with open(self.files[self.file_index], mode="r", encoding="utf-8") as fh:
+    def load_world(self, path):
+        if al_snapshot.is_snapshot(path):
+            self.load_snapshot(path)
+            return
+        with open(path, mode="r", encoding="utf-8") as fh:
             load_list = json.load(fh)
-            self.fill_the_world(load_list)
-        self.clear_file_buttons()
-
-    def save_world(self):
-        path = self.file_path("world")
-        save_list = [
-            {
-                "sun": self.sun,
-                "sun_level": self.sun_level,
-                "entropy": self.entropy,
-                "geyser": self.geyser,
-                "rain": self.rain
-            }
+        self.fill_the_world(load_list)
+
+    def save_snapshot(self, path=None, compress: bool = False):
+        if path is None:
+            path = self.file_path("world", al_snapshot.SUFFIX)
+        # snapshots hold whole ticks
+        if self.in_tick:
+            self.tick()
+        # the position of every entity in the update order is saved too, so
+        # a restored world steps its entities in the same order
+        columns = {"Geyser": [], "Energy": [], "Cell": []}
+        order = {"Geyser": [], "Energy": [], "Cell": []}
+        for position, entity in enumerate(self.entities.values()):
+            if not entity.inactive:
+                columns[entity.name].append(entity)
+                order[entity.name].append(position)
+        geysers = columns["Geyser"]
+        drops = columns["Energy"]
+        cells = columns["Cell"]
+
+        # one row per genome in use, cells refer to their row
+        rows = {}
+        genome_index = [
+            rows.setdefault(cell.genome_id, len(rows)) for cell in cells
         ]
+        genomes = b"".join(self.genomes[genome_id] for genome_id in rows)
+
+        def coords(entities):
+            return np.array(
+                [entity.coord for entity in entities],
+                dtype=np.int32
+            ).reshape(-1, 2)
+
+        if self.field is None:
+            energy_order = np.array(order["Energy"], dtype=np.int64)
+            energy_coord = coords(drops)
+            energy_energy = np.array(
+                [drop.energy for drop in drops], dtype=np.int64
+            )
+        else:
+            # field energy has no place in the update order
+            indices = self.field.indices()
+            y, x = np.divmod(indices, self.grid.stride)
+            energy_order = np.full(len(indices), -1, dtype=np.int64)
+            energy_coord = np.stack((x - 1, y - 1), axis=1).astype(np.int32)
+            energy_energy = self.field.values[indices]
+
+        arrays = {
+            "geyser_order": np.array(order["Geyser"], dtype=np.int64),
+            "energy_order": energy_order,
+            "cell_order": np.array(order["Cell"], dtype=np.int64),
+            "terrain": self.terrain().astype(np.uint8),
+            "geyser_coord": coords(geysers),
+            "geyser_energy": np.array(
+                [geyser.energy for geyser in geysers], dtype=np.int64
+            ),
+            "geyser_prod": np.array(
+                [geyser.prod_energy for geyser in geysers], dtype=np.int64
+            ),
+            "energy_coord": energy_coord,
+            "energy_energy": energy_energy,
+            "genomes": np.frombuffer(
+                genomes, dtype=np.uint8
+            ).reshape(-1, 109),
+            "cell_coord": coords(cells),
+            "cell_genome": np.array(genome_index, dtype=np.int32),
+            "cell_color": np.array(
+                [cell.color for cell in cells], dtype=np.uint8
+            ).reshape(-1, 3),
+            "cell_energy": np.array(
+                [cell.energy for cell in cells], dtype=np.int64
+            ),
+            "cell_orientation": np.array(
+                [cell.orientation for cell in cells], dtype=np.uint8
+            ),
+            "cell_start": np.array(
+                [cell.genome_start for cell in cells], dtype=np.uint8
+            ),
+            "cell_ttl": np.array([cell.ttl for cell in cells], dtype=np.int64),
+            "cell_counter": np.array(
+                [cell.internal_counter for cell in cells], dtype=np.int64
+            ),
+            "cell_criteria": np.array(
+                [cell.internal_counter_criteria for cell in cells],
+                dtype=np.int64
+            ),
+        }
+        settings = self.settings()
+        settings["size"] = list(self.size)
+        settings["ticks"] = self.ticks
+        settings["rng"] = self.rng.get_state()
+        return al_snapshot.write(path, settings, arrays, compress)
+
+    def load_snapshot(self, path):
+        snapshot = al_snapshot.read(path)
+        # check before anything of this world is thrown away
+        size = tuple(snapshot.settings.get("size", self.size))
+        if size != tuple(self.size):
+            raise al_snapshot.SnapshotError(
+                f"{path} holds a {size[0]}x{size[1]} world, "
+                f"this one is {self.size[0]}x{self.size[1]}"
+            )
+        self.rm_all()
+        self.apply_settings(snapshot.settings)
+        entities = []
+
+        if "terrain" in snapshot:
+            self.set_terrain(snapshot["terrain"])
+        else:
+            # version 1 snapshots keep the terrain as rock coordinates
+            terrain = np.zeros(self.terrain().shape, dtype=bool)
+            for x, y in snapshot["rock_coord"].tolist():
+                terrain[y, x] = True
+            self.set_terrain(terrain)
+
+        for position, coord, energy, prod in zip(
+                snapshot["geyser_order"].tolist(),
+                snapshot["geyser_coord"].tolist(),
+                snapshot["geyser_energy"].tolist(),
+                snapshot["geyser_prod"].tolist()
+        ):
+            geyser = Geyser(self, None, tuple(coord), prod)
+            geyser.energy = energy
+            entities.append((position, geyser))
+
+        for position, coord, energy in zip(
+                snapshot["energy_order"].tolist(),
+                snapshot["energy_coord"].tolist(),
+                snapshot["energy_energy"].tolist()
+        ):
+            if self.field is not None:
+                self.field.drop(self.grid.index(tuple(coord)), energy)
+                continue
+            entities.append(
+                (position, Energy(self, None, tuple(coord), energy))
+            )
+
+        genomes = [genome.tobytes() for genome in snapshot["genomes"]]
+        for position, coord, genome, color, energy, orientation, start, \
+                ttl, counter, criteria in zip(
+                    snapshot["cell_order"].tolist(),
+                    snapshot["cell_coord"].tolist(),
+                    snapshot["cell_genome"].tolist(),
+                    snapshot["cell_color"].tolist(),
+                    snapshot["cell_energy"].tolist(),
+                    snapshot["cell_orientation"].tolist(),
+                    snapshot["cell_start"].tolist(),
+                    snapshot["cell_ttl"].tolist(),
+                    snapshot["cell_counter"].tolist(),
+                    snapshot["cell_criteria"].tolist()
+                ):
+            cell = Cell(
+                self,
+                None,
+                tuple(coord),
+                tuple(color),
+                genomes[genome],
+                energy,
+                orientation,
+                start
+            )
+            cell.genome_start = start
+            cell.ttl = ttl
+            cell.internal_counter = counter
+            cell.internal_counter_criteria = criteria
+            entities.append((position, cell))
+
+        entities.sort(key=lambda item: item[0])
+        for _, entity in entities:
+            entity.id = self.get_id()
+            self.add_entity(entity)
+        self.ticks = snapshot.settings.get("ticks", 0)
+        if "rng" in snapshot.settings:
+            self.rng.set_state(snapshot.settings["rng"])
+
+    def save_world(self, path=None):
+        if path is None:
+            path = self.file_path("world")
+        if self.in_tick:
+            self.tick()
+        save_list = [self.settings()]
         for entity in self.entities.values():
-            if entity.name == "Rock":
+            if entity.inactive:
                 continue
             entity_dict = {
                 "name": entity.name,
@@ -371,83 +598,160 @@ class World():
                     }
                 )
             save_list.append(entity_dict)
+        if self.field is not None:
+            for index in self.field.indices().tolist():
+                save_list.append(
+                    {
+                        "name": "Energy",
+                        "coord": self.grid.coord(index),
+                        "energy": int(self.field.values[index]),
+                    }
+                )
         with open(path, mode="w", encoding="utf-8") as fh:
             json.dump(save_list, fh, indent=4,)
+        return path
 
-    def loop(self):
-
-        running = True
-
-        mouse_pressed = False
-
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
+    @property
+    def total_life_cells(self):
+        return self.stats.count("Cell")
 
-            self.info_bar()
+    @property
+    def total_nolife_objects(self):
+        return self.stats.count("Energy")
 
-            if self.go_life:
-                if self.rain:
-                    self.rainy()
-                keys = list(self.entities.keys())
-                for key in keys:
-                    self.entities[key]()
+    @property
+    def in_tick(self):
+        # a sliced tick has started and not finished yet
+        return self.slices is not None
 
-                self.info_bar.print_text(
-                    0,
-                    f"Total objects: "
-                    f"{self.total_life_cells + self.total_nolife_objects}"
-                )
-                self.info_bar.print_text(
-                    2,
-                    f"Total life cells: {self.total_life_cells}"
-                )
-                self.info_bar.print_text(
-                    3,
-                    f"No life objects: {self.total_nolife_objects}"
-                )
-                self.total_life_cells = 0
-                self.total_nolife_objects = 0
-
-            if self.remove_entities:
-                for remove_entity in self.remove_entities:
-                    self.entities.pop(remove_entity)
-                self.remove_entities = []
-
-            if not self.go_life:
-                x, y = pygame.mouse.get_pos()
-                x //= self.scale
-                y //= self.scale
-                entity = self.who_is_there((x, y))
-                if entity is None:
-                    self.info_bar.print_text(1, None)
-                else:
-                    self.info_bar.print_text(1, str(entity))
-
-                if pygame.mouse.get_pressed()[0] and not mouse_pressed:
-                    if entity is not None:
-                        entity.print_info()
-                        if entity.name == "Cell":
-                            self.focus_entity = entity
-                            self.clear_file_buttons()
-                            self.info_bar.assign_button(
-                                12,
-                                "Save sample",
-                                self.save_sample
-                            )
-                    else:
-                        max_x, max_y = self.max_coord
-                        if x <= max_x and y <= max_y:
-                            self.focus_coord = (x, y)
-                            self.load_sample_init()
-
-                    mouse_pressed = True
-                elif not pygame.mouse.get_pressed()[0]:
-                    mouse_pressed = False
-
-            if self.step_by_step:
-                self.go_life = False
-                self.step_by_step = False
-
-            pygame.display.flip()
+    def tick(self):
+        if self.slices is not None:
+            # finish the sliced tick in progress, that is the tick
+            while not self.tick_slice():
+                pass
+            return
+        self.begin_tick()
+        profiler.run("World.update_entities", self.update_entities)
+        self.end_tick()
+
+    def tick_slice(self):
+        # Run a tick slice_size entity updates at a time, so a front-end can
+        # handle its events between slices of a long tick. Returns True when
+        # the slice completed the tick, a tick is counted only then. The
+        # result is the same as running tick().
+        if self.slices is None:
+            self.begin_tick()
+            self.slices = self.entity_updates(self.slice_size)
+        if profiler.run("World.update_slice", next, self.slices, False):
+            return False
+        self.slices = None
+        self.end_tick()
+        return True
+
+    def begin_tick(self):
+        self.stats.new_tick()
+
+        # world switches wake the entities they concern, whether they were
+        # toggled or set directly
+        entropy, geyser = flags = (self.entropy, self.geyser)
+        if flags != self.awake_flags:
+            if entropy and not self.awake_flags[0]:
+                self.wake_all("Energy")
+            if geyser and not self.awake_flags[1]:
+                self.wake_all("Geyser")
+            self.awake_flags = flags
+
+        run = profiler.run
+        if self.rain:
+            run("World.rain", self.rainy)
+        if self.field is not None:
+            run("World.energy_field", self.field.step)
+
+    def end_tick(self):
+        profiler.run("World.purge", self.purge)
+        self.ticks += 1
+        if profiler.enabled:
+            profiler.tick(self.ticks)
+
+    def update_entities(self):
+        for _ in self.entity_updates():
+            pass
+
+    def entity_updates(self, slice_size: int | None = None):
+        # Entities are updated in id order, which is the order they were
+        # added in. Only active entities are in the list. One woken up during
+        # the tick gets its update in this tick yet, when it existed before
+        # the tick and its id is still ahead, like it would have if it was
+        # never asleep.
+        #
+        # Given a slice_size, yields True after every slice_size entities of
+        # the update order, entities woken in between come on top.
+        #
+        # An entity's own energy change is taken from before and after its
+        # update, changes to other entities are booked where they happen.
+        entities = self.entities
+        order = sorted(self.active)
+        count = len(order)
+        limit = self.next_entity_id
+        woken = self.woken = []
+        pending = []
+        energy = 0
+        i = 0
+        # -1 is never reached
+        stop = slice_size or -1
+        while True:
+            if pending and (i == count or pending[0] < order[i]):
+                key = heappop(pending)
+            elif i < count:
+                key = order[i]
+                i += 1
+            else:
+                break
+            entity = entities[key]
+            before = entity.energy
+            entity()
+            energy += entity.energy - before
+            if woken:
+                for woken_id in woken:
+                    if key < woken_id < limit:
+                        heappush(pending, woken_id)
+                woken.clear()
+            if i == stop:
+                # statistics stay current between slices
+                self.stats.energy += energy
+                energy = 0
+                stop += slice_size
+                yield True
+        self.woken = None
+        self.stats.energy += energy
+
+    def run(self, ticks: int):
+        for _ in range(ticks):
+            self.tick()
+
+
+def build_world(settings: dict, seed: int | None = None):
+    # Headless world from plain settings, every key is optional: size,
+    # sun_level, energy_field, rain_energy, geyser_energy, the sun, rain,
+    # entropy and geyser switches, geysers (how many to place), life (cells
+    # for add_life) and mutation (their mutation probability). The world is
+    # walled like the one main.py starts with.
+    world = World(
+        tuple(settings.get("size", (400, 200))),
+        sun_level=settings.get("sun_level", 1),
+        seed=seed,
+        energy_field=settings.get("energy_field", False)
+    )
+    world.build_walls()
+    world.sun = settings.get("sun", False)
+    world.rain = settings.get("rain", False)
+    world.entropy = settings.get("entropy", False)
+    world.geyser = settings.get("geyser", False)
+    world.rain_energy = settings.get("rain_energy", world.rain_energy)
+    world.geyser_energy = settings.get("geyser_energy", world.geyser_energy)
+    if settings.get("geysers"):
+        world.add_geysers(settings["geysers"])
+    if settings.get("life"):
+        world.add_life(settings["life"], settings.get("mutation"))
+    world.purge()
+    return world
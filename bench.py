@@ -0,0 +1,319 @@
+#!/bin/python3
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import resource
+import sys
+import tracemalloc
+from time import perf_counter
+from al_world import World, build_world
+from al_entities import Geyser, Energy
+from al_cell import Cell, compile_genome
+from al_profile import profiler
+
+
+# canonical headless scenarios, every one starts from a walled world like
+# main.py does
+SCENARIOS = {
+    "walled": {"size": (400, 200), "life": 0},
+    "life": {"size": (400, 200), "life": 1000, "sun": True},
+    "life-rain": {
+        "size": (400, 200), "life": 1000, "sun": True, "rain": True
+    },
+    "life-rain-entropy": {
+        "size": (400, 200), "life": 1000, "sun": True, "rain": True,
+        "entropy": True
+    },
+    "life-rain-field": {
+        "size": (400, 200), "life": 1000, "sun": True, "rain": True,
+        "energy_field": True
+    },
+    "life-rain-entropy-field": {
+        "size": (400, 200), "life": 1000, "sun": True, "rain": True,
+        "entropy": True, "energy_field": True
+    },
+    "geysers": {
+        "size": (400, 200), "life": 1000, "sun": True, "geysers": 50,
+        "geyser": True
+    },
+    "geysers-entropy": {
+        "size": (400, 200), "life": 1000, "sun": True, "geysers": 50,
+        "geyser": True, "entropy": True
+    },
+    "small": {"size": (200, 100), "life": 250, "sun": True, "rain": True},
+    "sparse": {"size": (200, 120), "life": 3, "sun": True},
+    "large": {"size": (800, 400), "life": 4000, "sun": True, "rain": True},
+    "huge": {
+        "size": (1600, 800), "life": 16000, "sun": True, "rain": True
+    },
+}
+
+ENGINES = ("object", "batch", "tiled", "checker")
+
+
+def timed(target, name: str, phases: dict):
+    # replace a bound method by one adding its run time to phases[name]
+    method = getattr(target, name)
+    phases[name] = 0.0
+
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        result = method(*args, **kwargs)
+        phases[name] += perf_counter() - start
+        return result
+
+    setattr(target, name, wrapper)
+
+
+def entity_memory(samples: int = 10000):
+    # traced bytes per instance of every entity type, the world's
+    # bookkeeping is not included. Cells of one lineage share their genome
+    # and compiled program, so "Cell" is a cell of an existing genome and
+    # "genome" what every new genome adds on top. All random input is drawn
+    # up front, so it is not traced.
+    world = World((100, 100), seed=0)
+    randint = world.rng.randint
+
+    def random_genome():
+        genome = [randint(0, 100) for _ in range(109)]
+        genome[100] = randint(0, 99)
+        return genome
+
+    coords = [(randint(0, 99), randint(0, 99)) for _ in range(samples)]
+    colors = [
+        (randint(80, 255), randint(80, 255), randint(80, 255))
+        for _ in range(samples)
+    ]
+    energies = [randint(1, 10000) for _ in range(samples)]
+    genomes = [random_genome() for _ in range(samples)]
+    shared = world.genomes[world.genomes.acquire(genomes[0])]
+    compile_genome(shared)
+
+    makers = {
+        "Geyser": lambda i: Geyser(world, None, coords[i]),
+        "Energy": lambda i: Energy(world, None, coords[i], energies[i]),
+        "Cell": lambda i: Cell(
+            world, None, coords[i], colors[i], shared, None, i % 8
+        ),
+        "genome": lambda i: compile_genome(
+            world.genomes[world.genomes.acquire(genomes[i])]
+        ),
+    }
+    result = {}
+    for name, make in makers.items():
+        entities = [None] * samples
+        tracemalloc.start()
+        for i in range(samples):
+            entities[i] = make(i)
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result[name] = round(allocated / samples, 1)
+        del entities
+    return result
+
+
+def run_scenario(
+        name: str,
+        engine: str,
+        ticks: int,
+        seed: int,
+        workers=None,
+        profile: bool = False
+):
+    scenario = SCENARIOS[name]
+    start = perf_counter()
+    world = build_world(scenario, seed)
+    build_time = perf_counter() - start
+
+    phases = {}
+    if engine == "object":
+        stepper = world
+        for phase in ("rainy", "update_entities", "purge"):
+            timed(world, phase, phases)
+    elif engine == "batch":
+        from al_batch import BatchEngine
+        stepper = BatchEngine(world)
+        for phase in ("rainy", "step_geysers", "step_energy", "step_cells"):
+            timed(stepper, phase, phases)
+    elif engine == "tiled":
+        from al_parallel import TiledEngine
+        stepper = TiledEngine(world, workers)
+    else:
+        from al_checker import CheckerEngine
+        stepper = CheckerEngine(world, workers)
+
+    if profile:
+        profiler.enable()
+
+    cell_updates = 0
+    start = perf_counter()
+    try:
+        for _ in range(ticks):
+            stepper.tick()
+            cell_updates += stepper.total_life_cells
+    finally:
+        elapsed = perf_counter() - start
+        if engine in ("tiled", "checker"):
+            stepper.close()
+
+    result = {
+        "scenario": name,
+        "engine": engine,
+        "size": list(scenario["size"]),
+        "seed": seed,
+        "ticks": ticks,
+        "build_seconds": round(build_time, 6),
+        "seconds": round(elapsed, 6),
+        "ticks_per_second": round(ticks / elapsed, 3) if elapsed else None,
+        "cell_updates_per_second":
+            round(cell_updates / elapsed, 1) if elapsed else None,
+        "final_life_cells": stepper.total_life_cells,
+        "final_nolife_objects": stepper.total_nolife_objects,
+        # entities still in the object engine's update list
+        "final_active_entities":
+            len(stepper.active) if engine == "object" else None,
+        "pool": stepper.pool.summary() if engine == "object" else None,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "phase_seconds": {
+            phase: round(value, 6) for phase, value in phases.items()
+        },
+        "entity_bytes": entity_memory(),
+    }
+    if profile:
+        result["profile"] = profiler.report()
+    return result
+
+
+def world_digest(world):
+    # digest of what is where, ids are left out as the checker engine
+    # hands them out in thread order
+    world.purge()
+    state = sorted(
+        (
+            entity.name,
+            entity.coord,
+            entity.energy,
+            tuple(getattr(entity, "genome", None) or ())
+        )
+        for entity in world.entities.values()
+    )
+    digest = hashlib.md5(repr((world.ticks, state)).encode())
+    if world.field is not None:
+        digest.update(world.field.values.tobytes())
+    return digest.hexdigest()
+
+
+def check_checker(name: str, ticks: int, seed: int, workers=(1, 2, 8)):
+    # the checker engine has to end in the same state whatever the number
+    # of workers
+    from al_checker import CheckerEngine
+    digests = {}
+    for count in workers:
+        world = build_world(SCENARIOS[name], seed)
+        with CheckerEngine(world, count) as engine:
+            engine.run(ticks)
+        digests[count] = world_digest(world)
+    return {
+        "scenario": name,
+        "engine": "checker",
+        "seed": seed,
+        "ticks": ticks,
+        "digests": digests,
+        "identical": len(set(digests.values())) == 1,
+    }
+
+
+def scenario_process(conn, *args):
+    try:
+        conn.send(run_scenario(*args))
+    except Exception as error:
+        conn.send({"error": repr(error)})
+    conn.close()
+
+
+def run_isolated(*args):
+    # every run gets a fresh process, so peak memory belongs to one run
+    context = multiprocessing.get_context("spawn")
+    conn, child_conn = context.Pipe()
+    process = context.Process(target=scenario_process, args=(child_conn,) + args)
+    process.start()
+    result = conn.recv()
+    process.join()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Headless benchmark of the artificial life simulator"
+    )
+    parser.add_argument(
+        "scenarios",
+        nargs="*",
+        default=[name for name in SCENARIOS if name != "huge"],
+        help=f"scenarios to run, from: {', '.join(SCENARIOS)}"
+    )
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument(
+        "--engine",
+        action="append",
+        choices=ENGINES,
+        help="engine to benchmark, may be given more than once "
+        "(default: object)"
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="add per command and per phase counters to the output, "
+        "this slows the run down"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="instead of timing, check that the checker engine ends in the "
+        "same state with 1, 2 and 8 workers"
+    )
+    parser.add_argument(
+        "--output",
+        help="append the JSON lines to this file instead of stdout"
+    )
+    args = parser.parse_args(argv)
+
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name}")
+
+    output = open(args.output, mode="a", encoding="utf-8") \
+        if args.output else sys.stdout
+    try:
+        if args.check:
+            failed = False
+            for name in args.scenarios:
+                result = check_checker(name, args.ticks, args.seed)
+                failed = failed or not result["identical"]
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+            if failed:
+                sys.exit(1)
+            return
+        for name in args.scenarios:
+            for engine in args.engine or ["object"]:
+                for _ in range(args.repeat):
+                    result = run_isolated(
+                        name, engine, args.ticks, args.seed, args.workers,
+                        args.profile
+                    )
+                    output.write(json.dumps(result) + "\n")
+                    output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -95,6 +95,45 @@ class TextField():
         self.screen.blit(self.text, self.text_rect)
 
 
+class Overlay():
+    def __init__(
+            self,
+            screen,
+            x,
+            y,
+            color_text="#FFFF66",
+            color_bg=(0, 0, 0, 180)
+    ):
+        self.screen = screen
+        self.x = x
+        self.y = y
+        self.color_text = color_text
+        self.color_bg = color_bg
+        self.surface = None
+        self.font = pygame.font.SysFont("LiberationMono", 14)
+
+    def text_set(self, lines):
+        if not lines:
+            self.surface = None
+            return
+        rendered = [
+            self.font.render(line, True, self.color_text) for line in lines
+        ]
+        width = max(text.get_width() for text in rendered) + 8
+        height = sum(text.get_height() for text in rendered) + 8
+        self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.surface.fill(self.color_bg)
+        y = 4
+        for text in rendered:
+            self.surface.blit(text, (4, y))
+            y += text.get_height()
+
+    def __call__(self):
+        if self.surface is None:
+            return
+        self.screen.blit(self.surface, (self.x, self.y))
+
+
 class InfoBar():
     def __init__(
             self,
@@ -147,6 +186,8 @@ class InfoBar():
             )
             self.text.append(text)
 
+        self.overlay = Overlay(self.screen, 4, 4)
+
     def assign_button(self, index, button_text, onclick_function):
         button = self.buttons[index]
         button.button_activate(button_text, onclick_function)
@@ -155,6 +196,12 @@ class InfoBar():
         text_field = self.text[index]
         text_field.text_set(text)
 
+    def overlay_set(self, lines):
+        self.overlay.text_set(lines)
+
+    def draw_overlay(self):
+        self.overlay()
+
     def __call__(self):
         self.screen.blit(self.bar_surface, self.bar_rect)
 
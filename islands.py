@@ -0,0 +1,97 @@
+#!/bin/python3
+
+import argparse
+import json
+import sys
+from time import perf_counter
+from al_islands import IslandRunner
+from al_snapshot import SUFFIX
+
+
+# every island gets these settings unless --config gives a list of its own
+DEFAULT_ISLAND = {
+    "size": (200, 100), "life": 250, "sun": True, "rain": True
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Island model run of several headless worlds, with "
+        "cells migrating between them"
+    )
+    parser.add_argument(
+        "--config",
+        help="JSON file holding a list of island settings, see "
+        "al_world.build_world"
+    )
+    parser.add_argument(
+        "--islands",
+        type=int,
+        default=4,
+        help="number of islands when no --config is given"
+    )
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument(
+        "--every",
+        type=int,
+        default=100,
+        help="ticks between two migrations"
+    )
+    parser.add_argument(
+        "--migrants",
+        type=int,
+        default=5,
+        help="cells leaving every island at a migration"
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--save",
+        action="store_true",
+        help="save a snapshot of every island at the end"
+    )
+    parser.add_argument(
+        "--output",
+        help="append the JSON lines to this file instead of stdout"
+    )
+    args = parser.parse_args(argv)
+
+    if args.config:
+        with open(args.config, mode="r", encoding="utf-8") as fh:
+            islands = json.load(fh)
+    else:
+        islands = [DEFAULT_ISLAND] * args.islands
+
+    output = open(args.output, mode="a", encoding="utf-8") \
+        if args.output else sys.stdout
+    start = perf_counter()
+    try:
+        with IslandRunner(islands, args.seed, args.migrants) as runner:
+            ticks = args.ticks
+            while ticks > 0:
+                summaries = runner.epoch(min(args.every, ticks))
+                ticks -= args.every
+                output.write(
+                    json.dumps(
+                        {
+                            "ticks": runner.ticks,
+                            "seconds": round(perf_counter() - start, 6),
+                            "landed": runner.landed,
+                            "islands": summaries,
+                        }
+                    ) + "\n"
+                )
+                output.flush()
+            if args.save:
+                runner.save(
+                    [
+                        f"island{n}-{runner.seeds[n]}{SUFFIX}"
+                        for n in range(len(islands))
+                    ]
+                )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,214 @@
 #!/bin/python3
 
-from al_world import World
-from al_entities import Rock
+import argparse
+from time import perf_counter
+from al_world import build_world
+from al_profile import profiler
+import al_snapshot
+import al_terrain
 
 
-def main():
-    world = World((400, 200), scale=4)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Artificial life simulator"
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        nargs=2,
+        default=(400, 200),
+        metavar=("WIDTH", "HEIGHT"),
+        help="world size, a loaded snapshot brings its own"
+    )
+    parser.add_argument("--scale", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--life",
+        type=int,
+        default=0,
+        help="random cells to start with"
+    )
+    parser.add_argument(
+        "--geysers",
+        type=int,
+        default=0,
+        help="geysers to place at random free positions"
+    )
+    parser.add_argument("--sun", action="store_true")
+    parser.add_argument("--sun-level", type=int, default=1)
+    parser.add_argument("--rain", action="store_true")
+    parser.add_argument("--entropy", action="store_true")
+    parser.add_argument(
+        "--geyser",
+        action="store_true",
+        help="switch the geysers on"
+    )
+    parser.add_argument(
+        "--energy-field",
+        action="store_true",
+        help="keep free energy as a dense field instead of entities"
+    )
+    parser.add_argument(
+        "--terrain",
+        metavar="IMAGE",
+        help="image whose dark pixels become terrain"
+    )
+    parser.add_argument(
+        "--load",
+        metavar="PATH",
+        help="world (snapshot or JSON) to start from, its settings "
+        "replace the switches above"
+    )
+    parser.add_argument(
+        "--ticks",
+        type=int,
+        default=None,
+        help="ticks to run headless: the whole run with --headless, "
+        "otherwise fast-forwarded before the window opens"
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="run without a window, until --ticks or Ctrl+C"
+    )
+    parser.add_argument(
+        "--autosave",
+        type=int,
+        default=0,
+        metavar="TICKS",
+        help="save a snapshot every this many ticks, 0 for never"
+    )
+    parser.add_argument(
+        "--save",
+        metavar="PATH",
+        help="save a snapshot here at the end of a headless run"
+    )
+    parser.add_argument(
+        "--report",
+        type=int,
+        default=1000,
+        metavar="TICKS",
+        help="print a status line every this many headless ticks"
+    )
+    parser.add_argument(
+        "--frame-budget",
+        type=float,
+        default=50,
+        metavar="MS",
+        help="longest a frame spends on the simulation, 0 for no limit"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="profile from the start, in the window P switches it"
+    )
+    parser.add_argument(
+        "--profile-dump",
+        metavar="PATH",
+        help="write the profiler report here while profiling is on, and "
+        "at the end of a headless run"
+    )
+    parser.add_argument(
+        "--profile-interval",
+        type=int,
+        default=1000,
+        metavar="TICKS",
+        help="ticks between two profiler reports, 0 for none"
+    )
+    args = parser.parse_args(argv)
+    if args.headless and args.profile_dump and not args.profile:
+        parser.error("--profile-dump needs --profile in a headless run")
+    return args
 
-    # build the perimeter wall
-    max_x, max_y = world.max_coord
-    for i in range(max_x + 1):
-        for j in (0, max_y):
-            rock = Rock(world, world.get_id(), (i, j))
-            world.add_entity(rock)
 
-    for i in range(1, max_y):
-        for j in (0, max_x):
-            rock = Rock(world, world.get_id(), (j, i))
-            world.add_entity(rock)
+def make_world(args):
+    size = tuple(args.size)
+    if args.load and al_snapshot.is_snapshot(args.load):
+        size = tuple(al_snapshot.read(args.load).settings["size"])
+    world = build_world(
+        {
+            "size": size,
+            "sun_level": args.sun_level,
+            "energy_field": args.energy_field,
+            "sun": args.sun,
+            "rain": args.rain,
+            "entropy": args.entropy,
+            "geyser": args.geyser,
+        },
+        args.seed
+    )
+    if args.load:
+        world.load_world(args.load)
+    if args.terrain:
+        world.set_terrain(
+            world.terrain() | al_terrain.from_image(args.terrain, size)
+        )
+    if args.geysers:
+        world.add_geysers(args.geysers)
+    if args.life:
+        world.add_life(args.life)
+    world.purge()
+    return world
 
-    world.loop()
+
+def report(world, ticks: int, elapsed: float):
+    rate = ticks / elapsed if elapsed else 0.0
+    print(
+        f"tick {world.ticks}: {world.total_life_cells} cells, "
+        f"{world.stats.distinct_genomes} genomes, "
+        f"{world.total_nolife_objects} energy, {rate:.1f} ticks/s",
+        flush=True
+    )
+
+
+def run_headless(world, ticks, autosave: int = 0, every: int = 1000):
+    # ticks None runs until interrupted
+    start = perf_counter()
+    done = 0
+    try:
+        while ticks is None or done < ticks:
+            world.tick()
+            done += 1
+            if autosave and world.ticks % autosave == 0:
+                world.save_snapshot()
+            if every and done % every == 0:
+                report(world, done, perf_counter() - start)
+    except KeyboardInterrupt:
+        pass
+    if not every or done % every:
+        report(world, done, perf_counter() - start)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    world = make_world(args)
+    if args.profile:
+        profiler.enable()
+
+    if args.headless:
+        if args.profile_dump:
+            profiler.set_dump(args.profile_dump, args.profile_interval)
+        run_headless(world, args.ticks, args.autosave, args.report)
+        if args.save:
+            world.save_snapshot(args.save)
+        if args.profile_dump:
+            profiler.dump(ticks=world.ticks)
+        return
+
+    if args.ticks:
+        run_headless(world, args.ticks, args.autosave, args.report)
+
+    # imported here, a headless run needs no display
+    from al_gui import Gui
+    gui = Gui(
+        world,
+        scale=args.scale,
+        frame_budget=args.frame_budget / 1000 if args.frame_budget else None,
+        autosave=args.autosave,
+        profile_path=args.profile_dump,
+        profile_interval=args.profile_interval
+    )
+    gui.loop()
 
 
 if __name__ == "__main__":
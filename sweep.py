@@ -0,0 +1,167 @@
+#!/bin/python3
+
+import argparse
+import itertools
+import json
+import multiprocessing
+from pathlib import Path
+from time import perf_counter
+import numpy as np
+from al_world import build_world
+
+
+# A sweep is described by a JSON file:
+#
+#   {
+#       "base": {"size": [200, 100], "life": 250, "sun": true, "rain": true},
+#       "grid": {"sun_level": [1, 2, 4], "rain_energy": [5000, 10000]},
+#       "random": {"samples": 20, "ranges": {"mutation": [0, 100]}},
+#       "seeds": [1, 2, 3]
+#   }
+#
+# base holds the settings every run shares, see al_world.build_world. Every
+# combination of the grid values is run, or samples random draws from the
+# ranges (integers when both bounds are), or both. Every configuration is
+# run once per seed.
+
+
+def configurations(spec: dict, seed: int = 0):
+    # (settings, seed) of every run, always in the same order for a spec
+    base = spec.get("base", {})
+    grid = spec.get("grid", {})
+    names = list(grid)
+    variants = [
+        dict(zip(names, values))
+        for values in itertools.product(*(grid[name] for name in names))
+    ]
+    if "random" in spec:
+        rng = np.random.default_rng(seed)
+        ranges = spec["random"]["ranges"]
+        samples = []
+        for _ in range(spec["random"]["samples"]):
+            sample = {}
+            for name, (low, high) in ranges.items():
+                if isinstance(low, int) and isinstance(high, int):
+                    sample[name] = int(rng.integers(low, high, endpoint=True))
+                else:
+                    sample[name] = float(rng.uniform(low, high))
+            samples.append(sample)
+        variants = [
+            dict(variant, **sample)
+            for variant in variants for sample in samples
+        ]
+    runs = []
+    for variant in variants:
+        for run_seed in spec.get("seeds", [1]):
+            runs.append((dict(base, **variant), run_seed))
+    return runs
+
+
+def run_key(settings: dict, seed: int, ticks: int):
+    # runs of another length are other runs
+    return json.dumps(
+        {"settings": settings, "seed": seed, "ticks": ticks}, sort_keys=True
+    )
+
+
+def run_configuration(args):
+    settings, seed, ticks = args
+    world = build_world(settings, seed)
+    extinction_tick = None
+    start = perf_counter()
+    for _ in range(ticks):
+        world.tick()
+        if not world.total_life_cells:
+            # there is no coming back from that
+            extinction_tick = world.ticks
+            break
+    elapsed = perf_counter() - start
+    return {
+        "key": run_key(settings, seed, ticks),
+        "settings": settings,
+        "seed": seed,
+        "ticks": world.ticks,
+        "seconds": round(elapsed, 6),
+        "ticks_per_second":
+            round(world.ticks / elapsed, 3) if elapsed else None,
+        "final_population": world.stats.count("Cell"),
+        "final_nolife_objects": world.stats.count("Energy"),
+        "distinct_genomes": world.stats.distinct_genomes,
+        "energy": world.stats.energy,
+        "extinction_tick": extinction_tick,
+    }
+
+
+def finished_keys(path):
+    # runs already in the results file, a line cut short by an interrupted
+    # sweep does not count
+    keys = set()
+    if not Path(path).exists():
+        return keys
+    with open(path, mode="r", encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                keys.add(json.loads(line)["key"])
+            except (ValueError, KeyError):
+                pass
+    return keys
+
+
+def ends_with_newline(path):
+    with open(path, mode="rb") as fh:
+        fh.seek(-1, 2)
+        return fh.read(1) == b"\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Parameter sweep over headless worlds, resumable"
+    )
+    parser.add_argument("spec", help="JSON file describing the sweep")
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="seed of the random samples, keep it to resume a sweep"
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--output",
+        default="sweep-results.jsonl",
+        help="results file, runs already in it are skipped"
+    )
+    args = parser.parse_args(argv)
+
+    with open(args.spec, mode="r", encoding="utf-8") as fh:
+        spec = json.load(fh)
+    done = finished_keys(args.output)
+    todo = [
+        (settings, seed, args.ticks)
+        for settings, seed in configurations(spec, args.seed)
+        if run_key(settings, seed, args.ticks) not in done
+    ]
+    print(f"{len(todo)} runs to go, {len(done)} already done")
+    if not todo:
+        return
+
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(args.workers) as pool, \
+            open(args.output, mode="a", encoding="utf-8") as output:
+        # finish a line cut short, the next result starts on its own line
+        if output.tell() and not ends_with_newline(args.output):
+            output.write("\n")
+        for n, result in enumerate(
+                pool.imap_unordered(run_configuration, todo), 1
+        ):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            print(
+                f"{n}/{len(todo)} population {result['final_population']} "
+                f"genomes {result['distinct_genomes']} "
+                f"{result['ticks_per_second']} ticks/s"
+            )
+
+
+if __name__ == "__main__":
+    main()